@@ -0,0 +1,101 @@
+"""
+Numba-compiled search kernels for the RAG retriever.
+
+Used as a fallback for deployments without simsimd. If numba is not
+installed, `make_topk_cosine` is None and the retriever stays on NumPy.
+"""
+
+import functools
+
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads, types
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    # Kernels are compiled for exactly these signatures (no per-call type dispatch).
+    # E comes in read-only when the index is memory-mapped, so both are listed.
+    _TOPK_RESULT = types.Tuple((types.float32[::1], types.int32[::1]))
+    _TOPK_SIGNATURES = [
+        _TOPK_RESULT(
+            types.Array(types.float32, 1, 'C'),
+            types.Array(types.float32, 2, 'C', readonly=readonly),
+            types.int64
+        )
+        for readonly in (False, True)
+    ]
+
+    @njit(inline='always', fastmath=True)
+    def _scan_rows(q, E, start, stop, dim, vals, idxs, k):
+        """Fold rows [start, stop) of E into one chunk's descending top-k (vals, idxs)."""
+        for i in range(start, stop):
+            s = np.float32(0.0)
+            for j in range(dim):
+                s += q[j] * E[i, j]
+            if s <= vals[k - 1]:
+                continue
+            # insertion into this chunk's descending top-k
+            pos = k - 1
+            while pos > 0 and vals[pos - 1] < s:
+                vals[pos] = vals[pos - 1]
+                idxs[pos] = idxs[pos - 1]
+                pos -= 1
+            vals[pos] = s
+            idxs[pos] = i
+
+    @njit(inline='always')
+    def _merge_chunks(vals, idxs, k):
+        """Merge the per-chunk top-k lists into the overall top-k, best first."""
+        flat_vals = vals.ravel()
+        flat_idxs = idxs.ravel()
+        order = np.argsort(-flat_vals, kind='mergesort')[:k]
+        return flat_vals[order], flat_idxs[order]
+
+    @functools.lru_cache(maxsize=None)
+    def make_topk_cosine(dim):
+        """
+        Return a top-k cosine kernel compiled for one fixed embedding dimension.
+
+        `dim` is a compile-time constant inside the returned kernel, so LLVM
+        can fully unroll and tile the inner dot product for it (e.g. 768 for
+        text-embedding-004). Calling it with rows of another width is an
+        error. Kernels are built once per dimension, on first use.
+        """
+        @njit(_TOPK_SIGNATURES, parallel=True, fastmath=True)
+        def topk_cosine_fixed_dim(q, E, k):
+            """
+            Top-k dot products of q against every row of E, best first.
+
+            q and the rows of E must already be unit length, so the dot product
+            is the cosine similarity. E is streamed once: each thread scans its
+            own chunk of rows and keeps a small sorted top-k, and the
+            per-thread lists are merged at the end, so no full similarity
+            array is allocated.
+
+            Args:
+                q: Query vector, float32, shape (dim,)
+                E: Embeddings, float32 C-contiguous, shape (n, dim)
+                k: Number of results (clipped to n)
+
+            Returns:
+                (scores, row_indices), each of length min(k, n)
+            """
+            n = E.shape[0]
+            k = min(k, n)
+            n_chunks = max(1, min(get_num_threads(), n))
+            chunk = (n + n_chunks - 1) // n_chunks
+
+            vals = np.full((n_chunks, k), -np.inf, dtype=np.float32)
+            idxs = np.full((n_chunks, k), -1, dtype=np.int32)
+
+            for c in prange(n_chunks):
+                _scan_rows(q, E, c * chunk, min(n, (c + 1) * chunk), dim, vals[c], idxs[c], k)
+
+            return _merge_chunks(vals, idxs, k)
+
+        return topk_cosine_fixed_dim
+else:
+    make_topk_cosine = None
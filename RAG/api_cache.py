@@ -0,0 +1,55 @@
+"""
+Persistent on-disk cache for embedding and LLM API responses.
+
+Entries are keyed by the SHA-256 of their inputs (model, task type, text, ...)
+and stored as raw bytes, so re-running a build or fill only pays for inputs
+that have not been seen before.
+"""
+
+import dbm
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+
+class DiskCache:
+    """Thread-safe bytes cache backed by a dbm file."""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open (or create) the cache.
+
+        Args:
+            path: Cache file path; dbm may add its own extension(s)
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = dbm.open(str(path), 'c')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Build a cache key from the inputs that determine a response."""
+        return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            return self._db.get(key)
+
+    def set(self, key: str, value: bytes):
+        """Store value under key."""
+        with self._lock:
+            self._db[key] = value
+
+    def sync(self):
+        """Flush pending writes to disk (a no-op for dbm backends without sync)."""
+        with self._lock:
+            if hasattr(self._db, 'sync'):
+                self._db.sync()
+
+    def close(self):
+        """Flush and close the underlying dbm file."""
+        with self._lock:
+            self._db.close()
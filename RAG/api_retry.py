@@ -0,0 +1,49 @@
+"""
+Retry policy for embedding and LLM API calls.
+
+Transient failures (rate limits, 5xx responses, timeouts) are retried with
+jittered exponential backoff so concurrent workers do not all retry at the
+same moment; every other error is raised immediately.
+"""
+
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Exception class names used by google-api-core, google-genai and openai for
+# the same conditions, matched by name so none of the SDKs must be importable.
+TRANSIENT_EXCEPTION_NAMES = {
+    'ResourceExhausted',
+    'TooManyRequests',
+    'ServiceUnavailable',
+    'InternalServerError',
+    'DeadlineExceeded',
+    'RateLimitError',
+    'APIConnectionError',
+    'APITimeoutError',
+}
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """Return True if exc (or the error it wraps) is worth retrying."""
+    while exc is not None:
+        if type(exc).__name__ in TRANSIENT_EXCEPTION_NAMES:
+            return True
+        for attr in ('code', 'status_code'):
+            if getattr(exc, attr, None) in TRANSIENT_STATUS_CODES:
+                return True
+        exc = exc.__cause__
+    return False
+
+
+retry_transient = retry(
+    retry=retry_if_exception(is_transient_error),
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    reraise=True,
+)
@@ -6,14 +6,27 @@ This script builds vector embeddings for both the Destination and Experience dat
 creating a semantic search index that can be saved and loaded for the RAG retrieval system.
 """
 
-import json
+import argparse
+import hashlib
 import os
-import pickle
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 
-from vector_index import VectorIndex
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+from api_cache import DiskCache
+from api_retry import retry_transient
+from vector_index import VectorIndex, read_json
 
 
 class EmbeddingGenerator:
@@ -24,12 +37,14 @@ class EmbeddingGenerator:
     optimized for semantic search and retrieval tasks.
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache_path: Optional[str] = None):
         """
         Initialize the embedding generator.
         
         Args:
             api_key: Google API key. If None, will try to get from GEMINI_API_KEY env var
+            cache_path: Optional path of a persistent embedding cache. When set,
+                texts embedded before (same model and task type) are not re-sent
         """
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         if not self.api_key:
@@ -43,11 +58,18 @@ class EmbeddingGenerator:
             genai.configure(api_key=self.api_key)
             self.genai = genai
             self.model_name = "models/text-embedding-004"
+            self.dimension = 768
         except ImportError:
             raise ImportError(
                 "google-generativeai package not found. "
                 "Install it with: pip install google-generativeai"
             )
+        
+        self.cache = DiskCache(cache_path) if cache_path else None
+    
+    def _cache_key(self, text: str, task_type: str) -> str:
+        """Cache key for one (model, task type, text) embedding."""
+        return DiskCache.make_key(self.model_name, task_type, text)
     
     def embed_text(self, text: str, task_type: str = "RETRIEVAL_DOCUMENT") -> np.ndarray:
         """
@@ -60,54 +82,272 @@ class EmbeddingGenerator:
         Returns:
             Numpy array of shape (768,)
         """
+        if self.cache is not None:
+            key = self._cache_key(text, task_type)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return np.frombuffer(cached, dtype=np.float32)
+        
         result = self.genai.embed_content(
             model=self.model_name,
             content=text,
             task_type=task_type
         )
-        return np.array(result['embedding'])
+        embedding = np.asarray(result['embedding'], dtype=np.float32)
+        
+        if self.cache is not None:
+            self.cache.set(key, embedding.tobytes())
+        return embedding
     
+    @retry_transient
+    def _embed_one_batch(self, batch: List[str], task_type: str) -> np.ndarray:
+        """
+        Embed one batch of texts with a single API request.
+
+        Rate limits and other transient errors are retried with jittered
+        exponential backoff (see api_retry); any other error is raised.
+
+        Returns:
+            Numpy array of shape (len(batch), 768)
+        """
+        result = self.genai.embed_content(
+            model=self.model_name,
+            content=batch,
+            task_type=task_type
+        )
+        return np.asarray(result['embedding'], dtype=np.float32)
+
     def embed_batch(
         self, 
         texts: List[str], 
         task_type: str = "RETRIEVAL_DOCUMENT",
-        batch_size: int = 100
+        batch_size: int = 100,
+        max_workers: int = 8
     ) -> np.ndarray:
         """
         Generate embeddings for multiple texts in batches.
-        
+
+        Each batch is sent as a single embed_content request (the API accepts a
+        list of texts and returns one embedding per text), and up to
+        max_workers batches are in flight at once. Results are written back at
+        their original offsets, so row order always matches `texts`. If a
+        cache is configured, only texts missing from it are sent.
+
         Args:
             texts: List of texts to embed
             task_type: Embedding task type
-            batch_size: Number of texts to process at once
-        
+            batch_size: Number of texts to send per API request
+            max_workers: Maximum number of concurrent API requests
+
         Returns:
             Numpy array of shape (len(texts), 768)
         """
-        embeddings = []
-        
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            print(f"Processing batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1}...")
-            
-            for text in batch:
-                embedding = self.embed_text(text, task_type)
-                embeddings.append(embedding)
-        
-        return np.array(embeddings)
+        if self.cache is None:
+            return self._embed_uncached(texts, task_type, batch_size, max_workers)
+        
+        keys = [self._cache_key(text, task_type) for text in texts]
+        cached = [self.cache.get(key) for key in keys]
+        missing = [i for i, value in enumerate(cached) if value is None]
+        print(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+        
+        fresh = self._embed_uncached([texts[i] for i in missing], task_type, batch_size, max_workers)
+        for row, i in enumerate(missing):
+            self.cache.set(keys[i], fresh[row].tobytes())
+        self.cache.sync()
+        
+        if not texts:
+            return fresh
+        dim = fresh.shape[1] if missing else len(cached[0]) // np.dtype(np.float32).itemsize
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        for i, value in enumerate(cached):
+            if value is not None:
+                embeddings[i] = np.frombuffer(value, dtype=np.float32)
+        if missing:
+            embeddings[missing] = fresh
+        return embeddings
+
+    def _embed_uncached(
+        self,
+        texts: List[str],
+        task_type: str,
+        batch_size: int,
+        max_workers: int
+    ) -> np.ndarray:
+        """Embed texts through the API, running up to max_workers batches concurrently."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        offsets = list(range(0, len(texts), batch_size))
+        num_batches = len(offsets)
+        embeddings = None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, num_batches)) as executor:
+            futures = {
+                executor.submit(self._embed_one_batch, texts[i:i + batch_size], task_type): i
+                for i in offsets
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                batch_embeddings = future.result()
+                print(f"Processed batch {done}/{num_batches}...")
+
+                # Allocate the output once we know the embedding dimension
+                if embeddings is None:
+                    embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+                embeddings[i:i + len(batch_embeddings)] = batch_embeddings
+
+        return embeddings
 
 
 class VectorIndexBuilder:
     """Builds and manages vector indexes for the RAG system."""
     
-    def __init__(self, embedding_generator: EmbeddingGenerator):
+    def __init__(
+        self,
+        embedding_generator: EmbeddingGenerator,
+        quantize: bool = False,
+        block_width: Optional[int] = None,
+        full_rebuild: bool = False,
+        ann: bool = False
+    ):
         """
         Initialize the index builder.
         
         Args:
             embedding_generator: Instance of EmbeddingGenerator
+            quantize: If True, save embeddings as int8 with per-row scales
+                (4x smaller than float32, slightly lower score precision)
+            block_width: If set (8 for AVX2, 16 for AVX-512), also save a
+                blocked (N/W, D, W) copy of the embeddings for SIMD kernels
+                that vectorize across points
+            full_rebuild: If True, re-embed every document instead of reusing
+                unchanged rows from the previously saved index
+            ann: If True, also save a FAISS HNSW (inner product) index as
+                <name>.faiss for approximate search over large corpora
         """
         self.embedding_generator = embedding_generator
+        self.quantize = quantize
+        self.block_width = block_width
+        self.full_rebuild = full_rebuild
+        self.ann = ann
+        if ann and faiss is None:
+            raise ImportError("--ann requires faiss (pip install faiss-cpu)")
+    
+    def _embedding_model(self) -> str:
+        """Embedding model name as recorded in index metadata, e.g. 'text-embedding-004'."""
+        return self.embedding_generator.model_name.split('/')[-1]
+    
+    @staticmethod
+    def _content_hashes(texts: List[str]) -> np.ndarray:
+        """Return the SHA-1 digest of every text as a fixed-width bytes array."""
+        return np.array(
+            [hashlib.sha1(t.encode('utf-8')).digest() for t in texts],
+            dtype='S20'
+        )
+    
+    @staticmethod
+    def _load_previous_embeddings(
+        output_dir: str,
+        name: str,
+        model: str,
+        dimension: int
+    ) -> Dict[bytes, np.ndarray]:
+        """
+        Map content hash -> embedding row of the index previously saved at
+        output_dir/name, so unchanged documents need not be re-embedded.
+
+        Returns an empty dict if there is no previous index, it has no saved
+        hashes, it was quantized (int8 rows are not reused as float32), or it
+        was built with a different embedding model or dimension than `model`
+        and `dimension` (rows from another embedding space must not be mixed
+        into the new index).
+        """
+        path = Path(output_dir) / name
+        hashes_path = path.with_suffix('.hashes.npy')
+        if not hashes_path.exists() or not path.with_suffix('.npy').exists():
+            return {}
+        try:
+            previous = VectorIndex.load(path, mmap_mode=None)
+        except Exception as e:
+            print(f"Could not load previous index {path}: {e}")
+            return {}
+        if previous.metadata.get('dtype') == 'int8':
+            return {}
+        if (previous.metadata.get('embedding_model') != model
+                or previous.embeddings.shape[1] != dimension):
+            print(f"Previous index {path} was built with a different embedding model; re-embedding everything")
+            return {}
+        
+        old_hashes = np.load(hashes_path)
+        if len(old_hashes) != len(previous.embeddings):
+            return {}
+        return {h: previous.embeddings[i] for i, h in enumerate(old_hashes.tolist())}
+    
+    def _embed_documents(
+        self,
+        texts: List[str],
+        previous: Optional[Dict[bytes, np.ndarray]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Embed document texts, batching them in order of length.
+
+        Texts whose content hash is found in `previous` reuse that embedding
+        instead of calling the API, so a rebuild only pays for changed
+        documents. Duplicate texts are embedded once. Sorting by length groups
+        texts of similar size into the same batch so no batch is held up by a
+        single long outlier. Results are scattered back so row i still
+        corresponds to texts[i].
+
+        Rows are L2-normalized, so cosine similarity against them reduces to a
+        plain dot product at query time.
+
+        Args:
+            texts: Document texts to embed
+            previous: Content hash -> embedding of a previous build, see
+                `_load_previous_embeddings`
+
+        Returns:
+            Tuple of (unit-length float32 array of shape (len(texts), embedding_dim),
+            content hashes of shape (len(texts),))
+        """
+        hashes = self._content_hashes(texts)
+        previous = previous or {}
+        changed = np.array([h not in previous for h in hashes.tolist()], dtype=bool)
+        if previous:
+            print(f"Reusing {int((~changed).sum())} unchanged embeddings, "
+                  f"embedding {int(changed.sum())} new or changed texts")
+
+        changed_texts = [t for t, c in zip(texts, changed) if c]
+        changed_embeddings = None
+        if changed_texts:
+            unique_texts, inverse = np.unique(np.asarray(changed_texts, dtype=object), return_inverse=True)
+            if len(unique_texts) < len(changed_texts):
+                print(f"Skipping {len(changed_texts) - len(unique_texts)} duplicate texts")
+
+            order = np.argsort([len(t) for t in unique_texts], kind='stable')
+            sorted_embeddings = self.embedding_generator.embed_batch(
+                [unique_texts[i] for i in order],
+                task_type="RETRIEVAL_DOCUMENT"
+            )
+
+            unique_embeddings = np.empty_like(sorted_embeddings)
+            unique_embeddings[order] = sorted_embeddings
+            changed_embeddings = unique_embeddings[inverse]
+
+        if changed_embeddings is None:
+            # Nothing was sent to the API: every text was reused, or there are none
+            dim = self.embedding_generator.dimension
+        else:
+            dim = changed_embeddings.shape[1]
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        if changed_embeddings is not None:
+            embeddings[changed] = changed_embeddings
+        for i in np.flatnonzero(~changed):
+            embeddings[i] = previous[hashes[i]]
+        
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.clip(norms, 1e-12, None)
+        return embeddings, hashes
     
     def build_destination_index(
         self, 
@@ -132,24 +372,23 @@ class VectorIndexBuilder:
         print("="*60)
         
         # Load destination database
-        with open(destination_db_path, 'r', encoding='utf-8') as f:
-            destinations = json.load(f)
+        destinations = read_json(destination_db_path)
         
         print(f"Loaded {len(destinations)} destinations")
         
         # Extract semantic profiles for embedding
-        semantic_profiles = []
-        for dest in destinations:
-            # Combine semantic_profile with one_line_pitch for richer context
-            combined_text = f"{dest.get('one_line_pitch', '')} {dest.get('semantic_profile', '')}"
-            semantic_profiles.append(combined_text)
+        # Combine semantic_profile with one_line_pitch for richer context
+        semantic_profiles = [
+            f"{dest.get('one_line_pitch', '')} {dest.get('semantic_profile', '')}"
+            for dest in destinations
+        ]
         
         # Generate embeddings
         print("Generating embeddings...")
-        embeddings = self.embedding_generator.embed_batch(
-            semantic_profiles,
-            task_type="RETRIEVAL_DOCUMENT"
+        previous = {} if self.full_rebuild else self._load_previous_embeddings(
+            output_dir, 'destination_index', self._embedding_model(), self.embedding_generator.dimension
         )
+        embeddings, hashes = self._embed_documents(semantic_profiles, previous)
         
         # Create index
         index = VectorIndex(
@@ -157,15 +396,16 @@ class VectorIndexBuilder:
             documents=destinations,
             metadata={
                 'index_type': 'destination',
-                'embedding_model': 'text-embedding-004',
+                'embedding_model': self._embedding_model(),
                 'embedding_dimension': embeddings.shape[1],
                 'num_documents': len(destinations),
-                'fields_embedded': ['one_line_pitch', 'semantic_profile']
+                'fields_embedded': ['one_line_pitch', 'semantic_profile'],
+                'normalized': True
             }
         )
         
         # Save index
-        self._save_index(index, output_dir, 'destination_index.pkl')
+        self._save_index(index, output_dir, 'destination_index', hashes)
         
         print(f"✓ Destination index built successfully!")
         print(f"  - {len(destinations)} destinations indexed")
@@ -195,24 +435,23 @@ class VectorIndexBuilder:
         print("="*60)
         
         # Load experience database
-        with open(experience_db_path, 'r', encoding='utf-8') as f:
-            experiences = json.load(f)
+        experiences = read_json(experience_db_path)
         
         print(f"Loaded {len(experiences)} experiences")
         
         # Extract semantic profiles for embedding
-        semantic_profiles = []
-        for exp in experiences:
-            # Combine one_line_pitch and semantic_profile for richer context
-            combined_text = f"{exp.get('one_line_pitch', '')} {exp.get('semantic_profile', '')}"
-            semantic_profiles.append(combined_text)
+        # Combine one_line_pitch and semantic_profile for richer context
+        semantic_profiles = [
+            f"{exp.get('one_line_pitch', '')} {exp.get('semantic_profile', '')}"
+            for exp in experiences
+        ]
         
         # Generate embeddings
         print("Generating embeddings...")
-        embeddings = self.embedding_generator.embed_batch(
-            semantic_profiles,
-            task_type="RETRIEVAL_DOCUMENT"
+        previous = {} if self.full_rebuild else self._load_previous_embeddings(
+            output_dir, 'experience_index', self._embedding_model(), self.embedding_generator.dimension
         )
+        embeddings, hashes = self._embed_documents(semantic_profiles, previous)
         
         # Create index
         index = VectorIndex(
@@ -220,15 +459,16 @@ class VectorIndexBuilder:
             documents=experiences,
             metadata={
                 'index_type': 'experience',
-                'embedding_model': 'text-embedding-004',
+                'embedding_model': self._embedding_model(),
                 'embedding_dimension': embeddings.shape[1],
                 'num_documents': len(experiences),
-                'fields_embedded': ['one_line_pitch', 'semantic_profile']
+                'fields_embedded': ['one_line_pitch', 'semantic_profile'],
+                'normalized': True
             }
         )
         
         # Save index
-        self._save_index(index, output_dir, 'experience_index.pkl')
+        self._save_index(index, output_dir, 'experience_index', hashes)
         
         print(f"✓ Experience index built successfully!")
         print(f"  - {len(experiences)} experiences indexed")
@@ -236,27 +476,124 @@ class VectorIndexBuilder:
         
         return index
     
-    def _save_index(self, index: VectorIndex, output_dir: str, filename: str):
-        """Save index to disk using pickle."""
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-        
-        filepath = output_path / filename
-        
-        with open(filepath, 'wb') as f:
-            pickle.dump(index, f)
-        
-        print(f"  - Saved to: {filepath}")
+    def _save_index(
+        self,
+        index: VectorIndex,
+        output_dir: str,
+        name: str,
+        hashes: Optional[np.ndarray] = None
+    ):
+        """
+        Save index to disk as <name>.npy plus a <name>.json sidecar.
+
+        If given, the per-document content hashes are written to
+        <name>.hashes.npy for the next incremental build. With `ann` set, a
+        FAISS HNSW index over the (float32, unit-length) rows is written to
+        <name>.faiss; otherwise any older <name>.faiss is removed, since its
+        rows would no longer match. Likewise a blocked copy is only kept when
+        `block_width` is set (see VectorIndex.save).
+        """
+        filepath = Path(output_dir) / name
+        self._check_search_layout(index)
+        if self.ann:
+            self._save_ann_index(index, filepath.with_suffix('.faiss'))
+        elif filepath.with_suffix('.faiss').exists():
+            filepath.with_suffix('.faiss').unlink()
+        if self.block_width:
+            index.metadata['block_width'] = self.block_width
+            index.metadata['block_pad'] = (-len(index.documents)) % self.block_width
+        else:
+            index.metadata.pop('block_width', None)
+            index.metadata.pop('block_pad', None)
+        if self.quantize:
+            index = index.quantize_int8()
+        index.save(filepath)
+        if hashes is not None:
+            np.save(filepath.with_suffix('.hashes.npy'), hashes)
+        
+        print(f"  - Saved to: {filepath}.npy / {filepath}.json")
+    
+    @staticmethod
+    def _save_ann_index(index: VectorIndex, path: Path, hnsw_m: int = 32):
+        """
+        Build and write a FAISS HNSW graph over the index rows.
+
+        The rows are unit length, so inner product equals cosine similarity.
+        FAISS ids are row numbers, matching the order of `index.documents`.
+        """
+        ann_index = faiss.IndexHNSWFlat(index.embeddings.shape[1], hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        ann_index.add(index.embeddings)
+        faiss.write_index(ann_index, str(path))
+        index.metadata['ann'] = 'faiss_hnsw'
+    
+    @staticmethod
+    def _check_search_layout(index: VectorIndex):
+        """
+        Validate that the embeddings can be fed to the SIMD kernel as-is and
+        record which similarity backend the index was built for.
+        """
+        embeddings = index.embeddings
+        if embeddings.dtype != np.float32 or not embeddings.flags['C_CONTIGUOUS']:
+            raise ValueError(
+                f"Embeddings must be C-contiguous float32, got {embeddings.dtype} "
+                f"(C_CONTIGUOUS={embeddings.flags['C_CONTIGUOUS']})"
+            )
+        index.metadata['sim_backend'] = 'simsimd' if simsimd is not None else 'numpy'
     
     @staticmethod
     def load_index(filepath: str) -> VectorIndex:
-        """Load a saved index from disk."""
-        with open(filepath, 'rb') as f:
-            return pickle.load(f)
+        """Load a saved index from disk (path without extension)."""
+        return VectorIndex.load(filepath)
+    
+    @staticmethod
+    def default_search(
+        index: VectorIndex,
+        query_embedding: np.ndarray,
+        top_k: int = 5
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a query against every row of an index with a single batched call.
+        
+        Uses simsimd.cdist (AVX2/AVX-512/NEON cosine kernel) when installed,
+        otherwise a NumPy matrix-vector product.
+        
+        Args:
+            index: A float32 or int8 VectorIndex
+            query_embedding: Query vector of shape (embedding_dim,)
+            top_k: Number of results to return
+        
+        Returns:
+            (row_indices, cosine_similarities) for the top_k rows, best first
+        """
+        if simsimd is not None:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            if index.embeddings.dtype == np.int8:
+                # Cosine ignores scale, so quantize the query the same way as the rows
+                query = np.round(query * (127.0 / np.abs(query).max())).astype(np.int8)
+            query = np.ascontiguousarray(query)[None, :]
+            distances = np.asarray(simsimd.cdist(query, index.embeddings, metric='cos'))[0]
+            similarities = 1.0 - distances
+        else:
+            embeddings = np.asarray(index.embeddings, dtype=np.float32)
+            query = np.asarray(query_embedding, dtype=np.float32)
+            similarities = (embeddings @ query) / (
+                np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query)
+            )
+        
+        top_indices = np.argsort(similarities)[::-1][:top_k]
+        return top_indices, similarities[top_indices]
 
 
 def main():
     """Main function to build both indexes."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quantize", action="store_true", help="Store embeddings as int8 with per-row scales")
+    parser.add_argument("--block-width", type=int, choices=[8, 16], default=None, help="Also save a blocked (N/W, D, W) embedding layout for SIMD kernels")
+    parser.add_argument("--no-cache", action="store_true", help="Re-embed every text instead of reusing cached embeddings")
+    parser.add_argument("--full-rebuild", action="store_true", help="Re-embed every document instead of reusing unchanged rows from the previous index")
+    parser.add_argument("--ann", action="store_true", help="Also save a FAISS HNSW index for approximate search (requires faiss)")
+    args = parser.parse_args()
+    
     print("\n🚀 RAG Vector Index Builder")
     print("Building semantic search indexes for Dual-Brain RAG System\n")
     
@@ -265,6 +602,7 @@ def main():
     destination_db = script_dir / "destination_db.json"
     experience_db = script_dir / "experience_db.json"
     output_dir = script_dir / "vector_indexes"
+    cache_path = script_dir / ".cache" / "embeddings"
     
     # Verify files exist
     if not destination_db.exists():
@@ -275,7 +613,7 @@ def main():
     # Initialize embedding generator
     print("Initializing Gemini Embedding API...")
     try:
-        embedding_gen = EmbeddingGenerator()
+        embedding_gen = EmbeddingGenerator(cache_path=None if args.no_cache else str(cache_path))
         print("✓ API initialized successfully\n")
     except Exception as e:
         print(f"✗ Failed to initialize API: {e}")
@@ -284,7 +622,13 @@ def main():
         return
     
     # Build indexes
-    builder = VectorIndexBuilder(embedding_gen)
+    builder = VectorIndexBuilder(
+        embedding_gen,
+        quantize=args.quantize,
+        block_width=args.block_width,
+        full_rebuild=args.full_rebuild,
+        ann=args.ann
+    )
     
     try:
         # Build destination index
@@ -303,8 +647,8 @@ def main():
         print("✓ All indexes built successfully!")
         print("="*60)
         print(f"\nIndexes saved to: {output_dir}/")
-        print("  - destination_index.pkl")
-        print("  - experience_index.pkl")
+        print("  - destination_index.npy / destination_index.json")
+        print("  - experience_index.npy / experience_index.json")
         print("\nYou can now use these indexes with the rag_retriever.py module.")
         
     except Exception as e:
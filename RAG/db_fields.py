@@ -0,0 +1,62 @@
+"""
+Which database fields the LLM fill pipeline targets, and which of them an
+entry is still missing.
+
+Kept free of third-party imports so helper scripts can share it without
+pulling in populate_db's HTTP and LLM client setup.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+
+DEST_KEYS_TO_FILL = (
+    "hk_express_destination_type",
+    "one_line_pitch",
+    "primary_archetype",
+    "semantic_profile",
+    "semantic_antiprofile",
+    "dominant_vibes",
+    "primary_experience_types",
+    "cost_index",
+    "logistics_hub_score",
+    "transport_profile",
+    "planner_memo",
+    "key_dichotomies",
+)
+
+EXP_KEYS_TO_FILL = (
+    "package_type",
+    "one_line_pitch",
+    "semantic_profile",
+    "semantic_antiprofile",
+    "primary_preference_tag",
+    "secondary_preference_tags",
+    "vibe_tags",
+    "cost_tier",
+    "duration_type",
+    "physical_intensity",
+    "logistics_model",
+    "package_inclusions",
+    "booking_lead_time_warning",
+    "event_details",
+    "itinerary_role",
+    "itinerary_pitch_text",
+    "hesitation_analyzer",
+    "conflict_solver",
+    "competing_experience_ids",
+    "upsell_opportunity_ids",
+    "planner_memo",
+)
+
+
+def find_missing_fields(entry: Dict[str, Any], keys_to_check: Sequence[str]) -> List[str]:
+    miss = []
+    append = miss.append
+    get = entry.get
+    for k in keys_to_check:
+        v = get(k)
+        # JSON values are exact str/list, so `type(v) is str` and `v == []`
+        # stand in for the slower isinstance checks
+        if v is None or v == [] or (type(v) is str and not v.strip()):
+            append(k)
+    return miss
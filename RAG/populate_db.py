@@ -8,7 +8,8 @@ enrichment via simple HTTP scraping.
 Design / Contract (short):
 - Inputs: paths to the two JSON files (defaults to RAG/destination_db.json and RAG/experience_db.json), flags --write (persist changes) and --web (allow using seed URLs in entries to fetch extra text), provider selection.
 - Output: Updated JSON files (if --write) or preview printed to stdout (dry-run). Backups created when writing.
-- Error modes: network/LLM failures are retried once and then raise; malformed LLM output is ignored and left unchanged.
+- Error modes: transient network/LLM failures (rate limits, 5xx, timeouts) are retried up to 5 times with jittered exponential backoff and then raise; malformed LLM output is ignored and left unchanged.
+- Caching: LLM responses are cached on disk under RAG/.cache keyed by (provider, model, prompt); pass --no-cache to bypass.
 
 Usage examples (see README_POPULATE.md for more):
   python RAG/populate_db.py --dry-run
@@ -17,18 +18,36 @@ Usage examples (see README_POPULATE.md for more):
 Environment variables:
 - OPENAI_API_KEY or GEMINI_API_KEY (depending on provider). For Gemini, you may need to set GEMINI_ENDPOINT.
 
-This script is intentionally conservative: it asks the LLM to return a JSON object
-with only the filled keys, so merging is straightforward.
+This script is intentionally conservative: it asks the LLM (in JSON output mode)
+to return a JSON object with only the filled keys, so merging is straightforward.
 """
 import argparse
 import json
 import os
+import re
+import shutil
 import time
 import copy
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api_cache import DiskCache
+from api_retry import retry_transient
+from db_fields import DEST_KEYS_TO_FILL, EXP_KEYS_TO_FILL, find_missing_fields
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except Exception:
+    HTMLParser = None
+
+try:
+    import orjson
+except Exception:
+    orjson = None
 
 try:
     import openai
@@ -39,51 +58,74 @@ ROOT = os.path.dirname(os.path.dirname(__file__))
 DEST_PATH = os.path.join(ROOT, "RAG", "destination_db.json")
 EXP_PATH = os.path.join(ROOT, "RAG", "experience_db.json")
 PROMPT_DIR = os.path.join(ROOT, "RAG", "prompts")
+LLM_CACHE_PATH = os.path.join(ROOT, "RAG", ".cache", "llm_responses")
 
 
 def load_json(path: str) -> List[Dict[str, Any]]:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def _dump_json(path: str, data: List[Dict[str, Any]]) -> None:
+    # write to a temp file and atomically rename it over the target, so an
+    # interrupted run never leaves a truncated database behind
+    tmp = path + ".tmp"
+    if orjson is not None:
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
 def write_json(path: str, data: List[Dict[str, Any]]) -> None:
-    # create backup
+    # create backup of the file as it was before the first write of this run
     bak = path + ".bak"
     if not os.path.exists(bak):
-        with open(bak, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-
-def find_missing_fields(entry: Dict[str, Any], keys_to_check: List[str]) -> List[str]:
-    miss = []
-    for k in keys_to_check:
-        v = entry.get(k, None)
-        if v is None:
-            miss.append(k)
-            continue
-        if isinstance(v, str) and v.strip() == "":
-            miss.append(k)
-            continue
-        if isinstance(v, list) and len(v) == 0:
-            miss.append(k)
-            continue
-    return miss
+        if os.path.exists(path):
+            shutil.copyfile(path, bak)
+        else:
+            _dump_json(bak, data)
+    _dump_json(path, data)
+
+
+def _make_http_session() -> requests.Session:
+    # one pooled keep-alive session for all page fetches, so repeated hosts
+    # skip the TCP + TLS handshake
+    session = requests.Session()
+    session.headers.update({"User-Agent": "ragn-llm/1.0"})
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=2, backoff_factor=0.3))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_SESSION = _make_http_session()
 
 
 def simple_web_fetch_text(url: str, timeout: int = 8) -> Optional[str]:
     try:
-        resp = requests.get(url, timeout=timeout, headers={"User-Agent": "ragn-llm/1.0"})
+        resp = _SESSION.get(url, timeout=timeout)
         if resp.status_code != 200:
             return None
-        doc = BeautifulSoup(resp.text, "html.parser")
-        # heuristics: page title + first 3 <p>
-        title = doc.title.string.strip() if doc.title and doc.title.string else ""
-        ps = doc.find_all("p")
+        # heuristics: page title + first 5 <p>
+        if HTMLParser is not None:
+            tree = HTMLParser(resp.text)
+            title_node = tree.css_first("title")
+            title = title_node.text().strip() if title_node else ""
+            paragraphs = [p.text().strip() for p in tree.css("p")[:5]]
+        else:
+            # fallback: selectolax not installed
+            from bs4 import BeautifulSoup
+            doc = BeautifulSoup(resp.text, "html.parser")
+            title = doc.title.string.strip() if doc.title and doc.title.string else ""
+            paragraphs = [p.get_text().strip() for p in doc.find_all("p")[:5]]
         text = title + "\n\n"
-        for p in ps[:5]:
-            t = p.get_text().strip()
+        for t in paragraphs:
             if t:
                 text += t + "\n\n"
         return text.strip()
@@ -97,6 +139,16 @@ def load_prompt(template_name: str) -> str:
         return f.read()
 
 
+# {{NAME}} placeholders used by the prompt templates. The templates also contain
+# literal JSON braces, so str.format_map can't be used on them directly.
+PLACEHOLDER_RE = re.compile(r"\{\{(ENTRY_JSON|MISSING|WEB_TEXT)\}\}")
+
+
+def render_prompt(template: str, values: Dict[str, str]) -> str:
+    # single pass over the template instead of one str.replace copy per placeholder
+    return PLACEHOLDER_RE.sub(lambda m: values.get(m.group(1), ""), template)
+
+
 def call_llm_openai(prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 1000) -> str:
     if openai is None:
         raise RuntimeError("openai package not installed. Install 'openai' to use OpenAI provider.")
@@ -111,6 +163,8 @@ def call_llm_openai(prompt: str, model: str = "gpt-4o-mini", max_tokens: int = 1
             messages=[{"role": "user", "content": prompt}],
             max_tokens=max_tokens,
             temperature=0.0,
+            # JSON mode: the reply is a single JSON object, no prose or fences
+            response_format={"type": "json_object"},
         )
         return resp.choices[0].message.content
     except Exception as e:
@@ -139,7 +193,12 @@ def call_llm_genai(prompt: str, model: str = "gemini-2.5-pro") -> str:
         raise RuntimeError(f"Failed to construct genai.Client(): {e}") from e
 
     try:
-        response = client.models.generate_content(model=model, contents=prompt)
+        # JSON mode: the reply is a single JSON object, no prose or fences
+        response = client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config={"response_mime_type": "application/json"},
+        )
     except Exception as e:
         raise RuntimeError(f"Model call failed: {e}") from e
 
@@ -164,6 +223,7 @@ def call_llm_genai(prompt: str, model: str = "gemini-2.5-pro") -> str:
         return str(response)
 
 
+@retry_transient
 def call_llm_generic(provider: str, prompt: str, model: str = None) -> str:
     # provider supports: openai, genai (alias: gemini)
     if provider == "openai":
@@ -173,14 +233,27 @@ def call_llm_generic(provider: str, prompt: str, model: str = None) -> str:
     raise NotImplementedError(f"Provider {provider} is not implemented. Use 'openai' or 'genai'.")
 
 
-def ask_fill(entry: Dict[str, Any], missing: List[str], prompt_template: str, web_text: Optional[str], provider: str, model: Optional[str] = None, prompt_only: bool = False) -> Optional[Dict[str, Any]]:
-    # Create prompt
-    prompt = prompt_template
-    # embed entry as pretty json
-    entry_json = json.dumps(entry, indent=2, ensure_ascii=False)
-    prompt = prompt.replace("{{ENTRY_JSON}}", entry_json)
-    prompt = prompt.replace("{{MISSING}}", json.dumps(missing))
-    prompt = prompt.replace("{{WEB_TEXT}}", web_text or "")
+def call_llm_cached(provider: str, prompt: str, model: Optional[str] = None, cache: Optional[DiskCache] = None) -> str:
+    # identical (provider, model, prompt) triples are answered from the on-disk cache
+    if cache is None:
+        return call_llm_generic(provider, prompt, model=model)
+    key = DiskCache.make_key(provider, model or "", prompt)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit.decode("utf-8")
+    raw = call_llm_generic(provider, prompt, model=model)
+    cache.set(key, str(raw).encode("utf-8"))
+    cache.sync()
+    return raw
+
+
+def ask_fill(entry: Dict[str, Any], missing: List[str], prompt_template: str, web_text: Optional[str], provider: str, model: Optional[str] = None, prompt_only: bool = False, cache: Optional[DiskCache] = None) -> Optional[Dict[str, Any]]:
+    # Create prompt (entry embedded as pretty json)
+    prompt = render_prompt(prompt_template, {
+        "ENTRY_JSON": json.dumps(entry, indent=2, ensure_ascii=False),
+        "MISSING": json.dumps(missing),
+        "WEB_TEXT": web_text or "",
+    })
     if prompt_only:
         # preview mode: print prompt and do not call the model
         print("\n--- Prompt preview (prompt-only mode) ---\n")
@@ -189,32 +262,14 @@ def ask_fill(entry: Dict[str, Any], missing: List[str], prompt_template: str, we
 
     # call LLM
     try:
-        raw = call_llm_generic(provider, prompt, model=model)
+        raw = call_llm_cached(provider, prompt, model=model, cache=cache)
     except Exception as e:
         print(f"LLM call failed: {e}")
         return None
 
-    # raw is expected to be a string containing JSON. Try to extract fenced JSON first.
+    # providers are called in JSON mode, so raw is the JSON object itself
     try:
-        text = raw if isinstance(raw, str) else str(raw)
-        # look for a fenced json block ```json ... ```
-        if "```json" in text:
-            start = text.index("```json") + len("```json")
-            end = text.find("```", start)
-            if end != -1:
-                blob = text[start:end].strip()
-            else:
-                blob = text[start:].strip()
-        else:
-            # fallback: take first {...} block
-            start = text.find("{")
-            end = text.rfind("}")
-            if start != -1 and end != -1 and end > start:
-                blob = text[start:end+1]
-            else:
-                blob = text
-
-        parsed = json.loads(blob)
+        parsed = json.loads(raw if isinstance(raw, str) else str(raw))
         # ensure only keys from missing are accepted
         filtered = {k: v for k, v in parsed.items() if k in missing}
         return filtered
@@ -223,83 +278,61 @@ def ask_fill(entry: Dict[str, Any], missing: List[str], prompt_template: str, we
         return None
 
 
-DEST_KEYS_TO_FILL = [
-    "hk_express_destination_type",
-    "one_line_pitch",
-    "primary_archetype",
-    "semantic_profile",
-    "semantic_antiprofile",
-    "dominant_vibes",
-    "primary_experience_types",
-    "cost_index",
-    "logistics_hub_score",
-    "transport_profile",
-    "planner_memo",
-    "key_dichotomies",
-]
-
-EXP_KEYS_TO_FILL = [
-    "package_type",
-    "one_line_pitch",
-    "semantic_profile",
-    "semantic_antiprofile",
-    "primary_preference_tag",
-    "secondary_preference_tags",
-    "vibe_tags",
-    "cost_tier",
-    "duration_type",
-    "physical_intensity",
-    "logistics_model",
-    "package_inclusions",
-    "booking_lead_time_warning",
-    "event_details",
-    "itinerary_role",
-    "itinerary_pitch_text",
-    "hesitation_analyzer",
-    "conflict_solver",
-    "competing_experience_ids",
-    "upsell_opportunity_ids",
-    "planner_memo",
-]
-
-
-def process_entries(entries: List[Dict[str, Any]], keys_to_fill: List[str], prompt_template_name: str, provider: str, web_mode: bool, write: bool, db_path: str, model: Optional[str] = None, prompt_only: bool = False, first_only: bool = False) -> None:
+def fetch_web_text(entry: Dict[str, Any]) -> Optional[str]:
+    # if the entry includes 'seed_urls' take the first that returns text
+    seed_urls = entry.get("seed_urls") or entry.get("seed_url")
+    if isinstance(seed_urls, list):
+        for u in seed_urls:
+            txt = simple_web_fetch_text(u)
+            if txt:
+                return txt
+    elif isinstance(seed_urls, str):
+        return simple_web_fetch_text(seed_urls)
+    return None
+
+
+def fill_entry(idx: int, entry: Dict[str, Any], missing: List[str], prompt_template: str, provider: str, web_mode: bool, model: Optional[str] = None, prompt_only: bool = False, cache: Optional[DiskCache] = None) -> Optional[Dict[str, Any]]:
+    # runs on a worker thread: only reads `entry`, the caller merges the result
+    print(f"Entry {idx} id={entry.get('destination_id') or entry.get('experience_id')} missing: {missing}")
+    web_text = fetch_web_text(entry) if web_mode else None
+    return ask_fill(entry, missing, prompt_template, web_text, provider, model=model, prompt_only=prompt_only, cache=cache)
+
+
+def process_entries(entries: List[Dict[str, Any]], keys_to_fill: Sequence[str], prompt_template_name: str, provider: str, web_mode: bool, write: bool, db_path: str, model: Optional[str] = None, prompt_only: bool = False, first_only: bool = False, cache: Optional[DiskCache] = None, concurrency: int = 8) -> None:
     prompt_template = load_prompt(prompt_template_name)
     changed = 0
-    for idx, entry in enumerate(entries):
-        if first_only and idx != 0:
-            # skip everything except first entry when first_only requested
-            continue
-        missing = find_missing_fields(entry, keys_to_fill)
-        if not missing:
-            continue
-        print(f"Entry {idx} id={entry.get('destination_id') or entry.get('experience_id')} missing: {missing}")
-        web_text = None
-        # if web mode and the entry includes 'seed_urls' take the first
-        seed_urls = entry.get("seed_urls") or entry.get("seed_url")
-        if web_mode and seed_urls:
-            if isinstance(seed_urls, list):
-                for u in seed_urls:
-                    txt = simple_web_fetch_text(u)
-                    if txt:
-                        web_text = txt
-                        break
-            elif isinstance(seed_urls, str):
-                web_text = simple_web_fetch_text(seed_urls)
-
-        result = ask_fill(entry, missing, prompt_template, web_text, provider, model=model, prompt_only=prompt_only)
-        if result:
-            for k, v in result.items():
-                entry[k] = v
-            changed += 1
-            print(f"Filled {len(result)} fields for entry {entry.get('destination_id') or entry.get('experience_id')}")
-            
-            # Save immediately after filling each entry
-            if write:
-                print(f"Saving changes to {db_path} immediately...")
-                write_json(db_path, entries)
-        else:
-            print("No fill produced for this entry (LLM error or parse failure).")
+
+    # entries are independent, so the LLM/web round-trips run concurrently;
+    # merging results and writing the file stay on this thread
+    # (prompt previews are printed in full, so keep them sequential)
+    workers = 1 if prompt_only else max(1, concurrency)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for idx, entry in enumerate(entries):
+            if first_only and idx != 0:
+                # skip everything except first entry when first_only requested
+                continue
+            missing = find_missing_fields(entry, keys_to_fill)
+            if not missing:
+                continue
+            future = executor.submit(fill_entry, idx, entry, missing, prompt_template, provider, web_mode, model=model, prompt_only=prompt_only, cache=cache)
+            futures[future] = idx
+
+        for future in as_completed(futures):
+            entry = entries[futures[future]]
+            result = future.result()
+            if result:
+                for k, v in result.items():
+                    entry[k] = v
+                changed += 1
+                print(f"Filled {len(result)} fields for entry {entry.get('destination_id') or entry.get('experience_id')}")
+
+                # Save immediately after filling each entry
+                if write:
+                    print(f"Saving changes to {db_path} immediately...")
+                    write_json(db_path, entries)
+            else:
+                print("No fill produced for this entry (LLM error or parse failure).")
 
     print(f"Completed; changed {changed} entries. (write={write})")
 
@@ -315,6 +348,8 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Alias for not writing files (default)")
     parser.add_argument("--prompt-only", action="store_true", help="Only build and print prompts, do not call any LLM provider")
     parser.add_argument("--first-only", action="store_true", help="Process only the first entry (useful for step-by-step testing)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of entries to fill in parallel (use 1 for sequential, ordered output)")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM instead of reusing cached responses for identical prompts")
     args = parser.parse_args()
 
     provider = args.provider
@@ -325,8 +360,13 @@ def main():
 
     print(f"Loaded {len(dests)} destinations and {len(exps)} experiences")
 
-    process_entries(dests, DEST_KEYS_TO_FILL, "llm_fill_destination.txt", provider, args.web, write, args.dest, model=args.model, prompt_only=args.prompt_only, first_only=args.first_only)
-    process_entries(exps, EXP_KEYS_TO_FILL, "llm_fill_experience.txt", provider, args.web, write, args.exp, model=args.model, prompt_only=args.prompt_only, first_only=args.first_only)
+    cache = None if args.no_cache or args.prompt_only else DiskCache(LLM_CACHE_PATH)
+
+    process_entries(dests, DEST_KEYS_TO_FILL, "llm_fill_destination.txt", provider, args.web, write, args.dest, model=args.model, prompt_only=args.prompt_only, first_only=args.first_only, cache=cache, concurrency=args.concurrency)
+    process_entries(exps, EXP_KEYS_TO_FILL, "llm_fill_experience.txt", provider, args.web, write, args.exp, model=args.model, prompt_only=args.prompt_only, first_only=args.first_only, cache=cache, concurrency=args.concurrency)
+
+    if cache is not None:
+        cache.close()
 
 
 if __name__ == "__main__":
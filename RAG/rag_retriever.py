@@ -6,15 +6,31 @@ This module provides the destination_retriever and experience_retriever tools
 that perform semantic search over the vector indexes.
 """
 
+import functools
+import logging
+import mmap
 import os
-import pickle
+import threading
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
 from vector_index import VectorIndex
 
 
+logger = logging.getLogger(__name__)
+
+
 # ANSI color codes for terminal output
 class Colors:
     CYAN = '\033[96m'
@@ -49,77 +65,265 @@ def _format_query_for_display(query: str, max_length: int = 100) -> str:
     return query
 
 
+_NO_ROWS = np.empty(0, dtype=np.int32)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_topk_kernel(dim: int):
+    """
+    Import the Numba top-k kernel on first use rather than at module import,
+    since importing numba and compiling the kernel's signatures takes seconds.
+    The kernel is specialized for the embedding dimension `dim`.
+    Returns None if numba is not installed.
+    """
+    from _kernels import make_topk_cosine
+    return make_topk_cosine(dim) if make_topk_cosine is not None else None
+
+
+def _prefetch(array: np.ndarray):
+    """Ask the kernel to read a memory-mapped array's pages ahead (Linux/macOS; no-op elsewhere)."""
+    mapping = getattr(array, '_mmap', None)
+    if mapping is not None and hasattr(mmap, 'MADV_WILLNEED'):
+        try:
+            mapping.madvise(mmap.MADV_WILLNEED)
+        except (OSError, ValueError):
+            pass
+
+
+def _norm(v: np.ndarray) -> float:
+    """L2 norm of a 1-D vector as a single BLAS dot, without np.linalg.norm's dispatch overhead."""
+    return np.sqrt(np.vdot(v, v))
+
+
 class SemanticRetriever:
     """
     Semantic search engine using cosine similarity on pre-built vector indexes.
     """
     
-    def __init__(self, embedding_generator):
+    def __init__(self, embedding_generator, query_cache_size: int = 1024):
         """
         Initialize the retriever.
         
         Args:
             embedding_generator: Instance of EmbeddingGenerator from build_vector_index.py
+            query_cache_size: Number of query embeddings kept in the in-memory LRU
         """
         self.embedding_generator = embedding_generator
         self.destination_index = None
         self.experience_index = None
+        self._exp_by_dest: Dict[str, np.ndarray] = {}
+        self._dest_rows_by_id: Dict[str, np.ndarray] = {}
+        
+        # Reusable similarity buffers for single-query searches, one per
+        # thread so concurrent searches never share (or wait for) scratch space
+        self._local = threading.local()
+        
+        # Optional FAISS HNSW indexes, keyed by metadata['index_type']
+        self._ann_indexes: Dict[str, Any] = {}
+        self._embed_query = functools.lru_cache(maxsize=query_cache_size)(self._embed_query_uncached)
+    
+    def _embed_query_uncached(self, query_string: str, task_type: str) -> np.ndarray:
+        """Embed a query; the result is shared through the LRU, so it is made read-only."""
+        embedding = np.array(
+            self.embedding_generator.embed_text(query_string, task_type=task_type),
+            dtype=np.float32
+        )
+        embedding.flags.writeable = False
+        return embedding
+    
+    def embed_query(self, query_string: str, task_type: str = "RETRIEVAL_QUERY") -> np.ndarray:
+        """
+        Embed a query through the retriever's LRU cache.
+        
+        Returns:
+            Read-only float32 embedding, the same one a search for query_string uses
+        """
+        return self._embed_query(query_string, task_type)
     
     def load_indexes(self, index_dir: str = "vector_indexes"):
         """
         Load pre-built vector indexes from disk.
         
+        Embeddings are memory-mapped from the .npy files, so opening an index
+        does not read the whole matrix into memory. Read-only maps of the
+        same file are backed by the same page-cache pages, so every worker
+        process (e.g. uvicorn --workers N) shares one physical copy of the
+        embeddings; nothing on the search path copies the mapped matrix.
+        Only legacy indexes that need a dtype/layout fix or normalization
+        (see _load_index) get a private in-memory copy, so rebuild those.
+        
         Args:
-            index_dir: Directory containing the .pkl index files
+            index_dir: Directory containing the .npy/.json index files
         """
         index_path = Path(index_dir)
         
         # Load destination index
-        dest_index_file = index_path / "destination_index.pkl"
-        if not dest_index_file.exists():
-            raise FileNotFoundError(f"Destination index not found: {dest_index_file}")
-        
-        with open(dest_index_file, 'rb') as f:
-            self.destination_index = pickle.load(f)
-        
+        self.destination_index = self._load_index(index_path / "destination_index")
         print(f"✓ Loaded destination index: {len(self.destination_index.documents)} destinations")
         
         # Load experience index
-        exp_index_file = index_path / "experience_index.pkl"
-        if not exp_index_file.exists():
-            raise FileNotFoundError(f"Experience index not found: {exp_index_file}")
+        self.experience_index = self._load_index(index_path / "experience_index")
+        print(f"✓ Loaded experience index: {len(self.experience_index.documents)} experiences")
         
-        with open(exp_index_file, 'rb') as f:
-            self.experience_index = pickle.load(f)
+        # Load approximate-search graphs built with build_vector_index.py --ann
+        self._ann_indexes = {}
+        if faiss is not None:
+            for name, index in (
+                ("destination_index", self.destination_index),
+                ("experience_index", self.experience_index),
+            ):
+                ann_path = index_path / f"{name}.faiss"
+                if ann_path.exists():
+                    ann_index = faiss.read_index(str(ann_path))
+                    ann_index.hnsw.efSearch = 64
+                    self._ann_indexes[index.metadata.get('index_type')] = ann_index
+                    print(f"✓ Loaded FAISS HNSW index: {ann_path.name}")
+        
+        # Build the id columns used for lookups and filtering once, up front
+        dest_ids = self.destination_index.column('destination_id')
+        parent_ids = self.experience_index.column('parent_destination_id')
+        
+        # Hash destination_id -> rows so Bottom-Up lookups cost O(len(destination_ids))
+        self._dest_rows_by_id = {
+            dest_id: np.flatnonzero(dest_ids == dest_id).astype(np.int32)
+            for dest_id in dict.fromkeys(dest_ids)
+        }
+        
+        # Precompute experience rows per destination so filtered searches are a lookup
+        self._exp_by_dest = {
+            dest_id: np.flatnonzero(parent_ids == dest_id).astype(np.int32)
+            for dest_id in dict.fromkeys(parent_ids)
+        }
+    
+    @staticmethod
+    def _load_index(path: Path) -> VectorIndex:
+        """
+        Memory-map one index (<path>.npy + <path>.json) read-only.
         
-        print(f"✓ Loaded experience index: {len(self.experience_index.documents)} experiences")
+        Indexes built before embeddings were stored unit-length are normalized
+        once here (into an in-memory float32 copy), so every query against
+        them is a single matvec instead of re-normalizing the whole matrix.
+        """
+        if not path.with_suffix('.npy').exists():
+            raise FileNotFoundError(f"Index not found: {path.with_suffix('.npy')}")
+        index = VectorIndex.load(path, mmap_mode='r')
+        
+        # Defensive: the kernels expect C-contiguous float32 (or int8 + scales)
+        expected_dtype = np.int8 if index.scales is not None else np.float32
+        if index.embeddings.dtype != expected_dtype or not index.embeddings.flags['C_CONTIGUOUS']:
+            index.embeddings = np.ascontiguousarray(index.embeddings, dtype=expected_dtype)
+        
+        if index.scales is None and not index.metadata.get('normalized', False):
+            embeddings = np.array(index.embeddings, dtype=np.float32)
+            row_norms = np.sqrt(np.einsum('ij,ij->i', embeddings, embeddings))
+            embeddings /= row_norms[:, None].clip(min=1e-12)
+            index.embeddings = embeddings
+            index.half_sq_norms = None
+            index.metadata['normalized'] = True
+        
+        # Start paging the mapped matrix in now rather than on the first search
+        _prefetch(index.embeddings)
+        
+        return index
     
-    def _cosine_similarity(self, query_embedding: np.ndarray, embeddings: np.ndarray) -> np.ndarray:
+    def _cosine_similarity(
+        self,
+        query_embedding: np.ndarray,
+        embeddings: np.ndarray,
+        normalized: bool = False,
+        scales: Optional[np.ndarray] = None,
+        half_sq_norms: Optional[np.ndarray] = None,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
         """
-        Compute cosine similarity between query and all document embeddings.
+        Compute cosine similarity between one or more queries and all document embeddings.
+        
+        Uses simsimd's cosine kernel for float32 and int8 embeddings when it
+        is installed, otherwise NumPy. A 2-D batch of queries is scored with a
+        single matrix-matrix product, so each embedding row is read once for
+        the whole batch.
         
         Args:
-            query_embedding: Shape (embedding_dim,)
+            query_embedding: Shape (embedding_dim,) or (n_queries, embedding_dim)
             embeddings: Shape (n_documents, embedding_dim)
+            normalized: True if the document embeddings are already unit length,
+                in which case only the query is normalized
+            scales: Per-row scales of an int8-quantized index, shape (n_documents,)
+            half_sq_norms: Precomputed 0.5 * ||row||^2, used for the row norms of
+                unnormalized embeddings, shape (n_documents,)
+            out: Optional C-contiguous float32 buffer of the result's shape to
+                write the scores into instead of allocating a new array
         
         Returns:
-            Similarity scores of shape (n_documents,)
+            Similarity scores of shape (n_documents,), or (n_queries, n_documents)
+            for a batch of queries
         """
-        # Normalize embeddings
-        query_norm = query_embedding / np.linalg.norm(query_embedding)
-        embeddings_norm = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        # Normalize embeddings (in float32, so the dot products never upcast to float64)
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        single = query_embedding.ndim == 1
+        queries = np.atleast_2d(query_embedding)
+        out2d = out.reshape(len(queries), -1) if out is not None else None
+        
+        if (
+            simsimd is not None
+            and embeddings.dtype in (np.float32, np.int8)
+            and embeddings.flags['C_CONTIGUOUS']
+        ):
+            if embeddings.dtype == np.int8:
+                # Cosine ignores scale, so quantize the queries the same way as the rows
+                # and let simsimd run its int8 kernel (VNNI/NEON dot products)
+                max_abs = np.abs(queries).max(axis=1, keepdims=True) + 1e-12
+                queries = np.round(queries * (127.0 / max_abs)).astype(np.int8)
+            # SIMD cosine kernel (AVX2/AVX-512/NEON); handles both norms itself
+            if out2d is not None:
+                simsimd.cdist(
+                    np.ascontiguousarray(queries), embeddings, metric='cos',
+                    out=out2d, out_dtype='float32'
+                )
+                similarities = np.subtract(1.0, out2d, out=out2d)
+            else:
+                distances = simsimd.cdist(np.ascontiguousarray(queries), embeddings, metric='cos')
+                similarities = 1.0 - np.asarray(distances, dtype=np.float32)
+            return similarities[0] if single else similarities
+        
+        if single:
+            query_norms = _norm(query_embedding)
+        else:
+            query_norms = np.sqrt(np.einsum('ij,ij->i', queries, queries))[:, None]
+        queries_norm = queries / (query_norms + 1e-12)
         
-        # Compute cosine similarity
-        similarities = np.dot(embeddings_norm, query_norm)
+        if normalized and scales is None:
+            queries_norm = queries_norm.astype(embeddings.dtype, copy=False)
+        if out2d is not None:
+            similarities = np.dot(queries_norm, embeddings.T, out=out2d)
+        else:
+            similarities = np.dot(queries_norm, embeddings.T)
+        
+        if scales is not None:
+            # Quantized rows are unit vectors multiplied by their scale
+            similarities /= scales
+        elif normalized:
+            pass
+        elif half_sq_norms is not None:
+            similarities /= np.sqrt(2.0 * half_sq_norms)
+        else:
+            # Row norms in one fused pass (no temporary embeddings**2 matrix),
+            # applied to the scores rather than dividing the whole matrix
+            row_norms = np.einsum('ij,ij->i', embeddings, embeddings)
+            np.sqrt(row_norms, out=row_norms)
+            
+            # Compute cosine similarity
+            similarities /= row_norms
         
-        return similarities
+        return similarities[0] if single else similarities
     
     def _search(
         self,
         query_embedding: np.ndarray,
         index,
         top_k: int = 5,
-        filter_fn: Optional[callable] = None
+        filter_fn: Optional[callable] = None,
+        rows: Optional[np.ndarray] = None
     ) -> List[Tuple[Dict[str, Any], float]]:
         """
         Perform semantic search on an index.
@@ -129,36 +333,199 @@ class SemanticRetriever:
             index: VectorIndex object
             top_k: Number of top results to return
             filter_fn: Optional function to filter documents (returns True to keep)
+            rows: Optional precomputed row indices to search within; takes
+                precedence over filter_fn
         
         Returns:
             List of (document, similarity_score) tuples
         """
-        # Apply filter if provided
-        if filter_fn:
-            valid_indices = [i for i, doc in enumerate(index.documents) if filter_fn(doc)]
-            filtered_embeddings = index.embeddings[valid_indices]
-            filtered_documents = [index.documents[i] for i in valid_indices]
-        else:
-            filtered_embeddings = index.embeddings
-            filtered_documents = index.documents
-        
-        if len(filtered_documents) == 0:
-            return []
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        return self._search_batch(query_embedding[None, :], index, top_k, filter_fn, rows)[0]
+    
+    def _search_batch(
+        self,
+        query_embeddings: np.ndarray,
+        index,
+        top_k: int = 5,
+        filter_fn: Optional[callable] = None,
+        rows: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Perform semantic search on an index for a batch of queries at once.
         
-        # Compute similarities
-        similarities = self._cosine_similarity(query_embedding, filtered_embeddings)
+        Args:
+            query_embeddings: Query vectors, shape (n_queries, embedding_dim)
+            index: VectorIndex object
+            top_k: Number of top results to return per query
+            filter_fn: Optional function to filter documents (returns True to keep)
+            rows: Optional precomputed row indices to search within; takes
+                precedence over filter_fn
         
-        # Get top-k indices
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        Returns:
+            One list of (document, similarity_score) tuples per query
+        """
+        n_queries = len(query_embeddings)
+        
+        # Resolve the filter to row indices; the embeddings themselves are never
+        # gathered, only the similarity columns of the kept rows
+        if rows is None and filter_fn:
+            rows = np.asarray(
+                [i for i, doc in enumerate(index.documents) if filter_fn(doc)],
+                dtype=np.int32
+            )
+        n_candidates = len(index.documents) if rows is None else len(rows)
+        
+        if n_candidates == 0 or top_k <= 0:
+            return [[] for _ in range(n_queries)]
+        
+        # Approximate search through the FAISS HNSW graph, if one was built
+        ann_index = self._ann_indexes.get(index.metadata.get('index_type'))
+        if ann_index is not None:
+            return self._ann_search(ann_index, query_embeddings, index, top_k, rows)
+        
+        # Without simsimd, use the fused Numba cosine + top-k kernel if available
+        if (
+            n_queries == 1
+            and rows is None
+            and simsimd is None
+            and index.scales is None
+            and index.metadata.get('normalized', False)
+            and index.embeddings.dtype == np.float32
+            and index.embeddings.flags['C_CONTIGUOUS']
+            and _load_topk_kernel(index.embeddings.shape[1]) is not None
+        ):
+            query = np.asarray(query_embeddings[0], dtype=np.float32)
+            query = np.ascontiguousarray(query / (_norm(query) + 1e-12))
+            topk_kernel = _load_topk_kernel(index.embeddings.shape[1])
+            scores, top_indices = topk_kernel(query, np.asarray(index.embeddings), top_k)
+            return [[
+                (index.documents[i], float(score))
+                for score, i in zip(scores, top_indices)
+            ]]
+        
+        # Single queries reuse this thread's buffer; batches allocate
+        out = None
+        if n_queries == 1:
+            out = self._sims_buffer(len(index.documents))
+        similarities = self._score(query_embeddings, index, out=out)
+        return self._top_k_results(similarities, index, top_k, rows)
+    
+    def _sims_buffer(self, n_docs: int) -> np.ndarray:
+        """This thread's (1, n_docs) similarity buffer, grown on demand."""
+        buf = getattr(self._local, 'sims', None)
+        if buf is None or len(buf) < n_docs:
+            buf = self._local.sims = np.empty(n_docs, dtype=np.float32)
+        return buf[:n_docs].reshape(1, n_docs)
+    
+    @staticmethod
+    def _ann_search(
+        ann_index,
+        query_embeddings: np.ndarray,
+        index,
+        top_k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Top-k search through a FAISS inner-product HNSW index.
         
-        # Return documents with scores
-        results = [
-            (filtered_documents[i], float(similarities[i]))
-            for i in top_indices
+        Queries are normalized so the inner product is the cosine similarity.
+        A row filter is applied inside the graph search via IDSelectorArray.
+        """
+        queries = np.array(query_embeddings, dtype=np.float32, ndmin=2)
+        queries /= np.sqrt(np.einsum('ij,ij->i', queries, queries))[:, None] + 1e-12
+        
+        params = None
+        k = top_k
+        if rows is not None:
+            # The selector only holds a pointer, so `ids` must outlive the search
+            ids = np.ascontiguousarray(rows, dtype=np.int64)
+            params = faiss.SearchParametersHNSW(sel=faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids)))
+            k = min(top_k, len(ids))
+        
+        scores, top_indices = ann_index.search(queries, k, params=params)
+        return [
+            [
+                (index.documents[i], float(score))
+                for score, i in zip(query_scores, query_indices)
+                if i >= 0
+            ]
+            for query_scores, query_indices in zip(scores, top_indices)
         ]
+    
+    def _score(
+        self,
+        query_embeddings: np.ndarray,
+        index,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Similarities of every query against every row of index, shape (n_queries, n_documents)."""
+        # Compute similarities for all queries in one streaming pass over the full matrix
+        return self._cosine_similarity(
+            query_embeddings,
+            index.embeddings,
+            normalized=index.metadata.get('normalized', False),
+            scales=index.scales,
+            half_sq_norms=index.half_sq_norms,
+            out=out
+        )
+    
+    @staticmethod
+    def _top_k_results(
+        similarities: np.ndarray,
+        index,
+        top_k: int,
+        rows: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """Turn a (n_queries, n_documents) score matrix into top-k (document, score) lists."""
+        if rows is not None:
+            similarities = similarities[:, rows]
+        
+        # Get top-k indices per query: partial selection in O(n), then sort only those k
+        k = min(top_k, similarities.shape[1])
+        top_candidates = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        
+        results = []
+        for query_similarities, candidates in zip(similarities, top_candidates):
+            top_indices = candidates[np.argsort(-query_similarities[candidates], kind='stable')]
+            doc_indices = top_indices if rows is None else rows[top_indices]
+            
+            # Return documents with scores
+            results.append([
+                (index.documents[doc_i], float(query_similarities[i]))
+                for i, doc_i in zip(top_indices, doc_indices)
+            ])
         
         return results
     
+    def batch_search(
+        self,
+        queries: List[str],
+        index,
+        top_k: int = 5,
+        rows: Optional[np.ndarray] = None,
+        task_type: str = "RETRIEVAL_QUERY"
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """
+        Embed and search several queries against one index together.
+        
+        The queries are stacked into one matrix and scored with a single
+        matrix-matrix product instead of one matrix-vector product each.
+        
+        Args:
+            queries: Natural language queries
+            index: VectorIndex object
+            top_k: Number of top results to return per query
+            rows: Optional precomputed row indices to search within
+            task_type: Embedding task type for the queries
+        
+        Returns:
+            One list of (document, similarity_score) tuples per query, in order
+        """
+        if not queries:
+            return []
+        query_embeddings = np.vstack([self._embed_query(q, task_type) for q in queries])
+        return self._search_batch(query_embeddings, index, top_k=top_k, rows=rows)
+    
     def destination_retriever(
         self,
         query_string: Optional[str] = None,
@@ -183,38 +550,38 @@ class SemanticRetriever:
         
         # Bottom-Up: Direct ID lookup
         if destination_ids:
-            results = [
-                doc for doc in self.destination_index.documents
-                if doc['destination_id'] in destination_ids
+            # In the order of destination_ids (callers pass them ranked), each once
+            documents = self.destination_index.documents
+            return [
+                documents[i]
+                for dest_id in dict.fromkeys(destination_ids)
+                for i in self._dest_rows_by_id.get(dest_id, _NO_ROWS)
             ]
-            return results
         
         # Top-Down: Semantic search
         if query_string:
-            # Generate query embedding
-            query_embedding = self.embedding_generator.embed_text(
-                query_string,
-                task_type="RETRIEVAL_QUERY"
-            )
-            
-            # Perform search
-            results_with_scores = self._search(
-                query_embedding,
+            # Embed and search (a batch of one)
+            results_with_scores = self.batch_search(
+                [query_string],
                 self.destination_index,
                 top_k=top_k
-            )
+            )[0]
             
             # Return just the documents (without scores for cleaner agent input)
             results = [doc for doc, score in results_with_scores]
             
-            # Debug: Print scores with cleaner formatting
-            print(f"\n{Colors.CYAN}🔍 RAG: Destination Search{Colors.END}")
-            display_query = _format_query_for_display(query_string)
-            print(f"   {Colors.YELLOW}{display_query}{Colors.END}")
-            print(f"   {Colors.GREEN}→ Top {len(results_with_scores)} Destinations:{Colors.END}")
-            for i, (doc, score) in enumerate(results_with_scores, 1):
-                score_color = Colors.GREEN if score > 0.5 else Colors.YELLOW if score > 0.4 else Colors.END
-                print(f"      {i}. {doc['destination_name']} ({doc['destination_id']}) - {score_color}Score: {score:.3f}{Colors.END}")
+            # Debug: Log scores with cleaner formatting (skipped entirely unless DEBUG is on)
+            if logger.isEnabledFor(logging.DEBUG):
+                display_query = _format_query_for_display(query_string)
+                lines = [
+                    f"\n{Colors.CYAN}🔍 RAG: Destination Search{Colors.END}",
+                    f"   {Colors.YELLOW}{display_query}{Colors.END}",
+                    f"   {Colors.GREEN}→ Top {len(results_with_scores)} Destinations:{Colors.END}",
+                ]
+                for i, (doc, score) in enumerate(results_with_scores, 1):
+                    score_color = Colors.GREEN if score > 0.5 else Colors.YELLOW if score > 0.4 else Colors.END
+                    lines.append(f"      {i}. {doc['destination_name']} ({doc['destination_id']}) - {score_color}Score: {score:.3f}{Colors.END}")
+                logger.debug("\n".join(lines))
             
             return results
         
@@ -242,56 +609,121 @@ class SemanticRetriever:
         if self.experience_index is None:
             raise RuntimeError("Experience index not loaded. Call load_indexes() first.")
         
-        # Generate query embedding
-        query_embedding = self.embedding_generator.embed_text(
-            query_string,
-            task_type="RETRIEVAL_QUERY"
-        )
-        
-        # Create filter function if destination_id is provided
-        filter_fn = None
+        # Restrict to the destination's precomputed rows if destination_id is provided
+        rows = None
         if destination_id:
-            filter_fn = lambda doc: doc.get('parent_destination_id') == destination_id
+            rows = self._exp_by_dest.get(destination_id, _NO_ROWS)
         
-        # Perform search
-        results_with_scores = self._search(
-            query_embedding,
+        # Embed and search (a batch of one)
+        results_with_scores = self.batch_search(
+            [query_string],
             self.experience_index,
             top_k=top_k,
-            filter_fn=filter_fn
-        )
+            rows=rows
+        )[0]
         
         # Return just the documents
         results = [doc for doc, score in results_with_scores]
         
-        # Debug: Print scores with cleaner formatting
-        if destination_id:
-            print(f"\n{Colors.MAGENTA}🎯 RAG: Experience Search for {destination_id}{Colors.END}")
-        else:
-            print(f"\n{Colors.MAGENTA}🎯 RAG: Experience Search{Colors.END}")
+        # Debug: Log scores with cleaner formatting (skipped entirely unless DEBUG is on)
+        if logger.isEnabledFor(logging.DEBUG):
+            if destination_id:
+                lines = [f"\n{Colors.MAGENTA}🎯 RAG: Experience Search for {destination_id}{Colors.END}"]
+            else:
+                lines = [f"\n{Colors.MAGENTA}🎯 RAG: Experience Search{Colors.END}"]
+            
+            # Format query for display
+            display_query = _format_query_for_display(query_string, max_length=80)
+            lines.append(f"   {Colors.YELLOW}{display_query}{Colors.END}")
+            lines.append(f"   {Colors.GREEN}→ Top {len(results_with_scores)} Experiences:{Colors.END}")
+            
+            for i, (doc, score) in enumerate(results_with_scores, 1):
+                score_color = Colors.GREEN if score > 0.45 else Colors.YELLOW if score > 0.35 else Colors.END
+                exp_name = doc['experience_name']
+                exp_id = doc['experience_id']
+                lines.append(f"      {i}. {exp_name} ({exp_id}) - {score_color}Score: {score:.3f}{Colors.END}")
+            logger.debug("\n".join(lines))
         
-        # Format query for display
-        display_query = _format_query_for_display(query_string, max_length=80)
-        print(f"   {Colors.YELLOW}{display_query}{Colors.END}")
-        print(f"   {Colors.GREEN}→ Top {len(results_with_scores)} Experiences:{Colors.END}")
+        return results
+
+    
+    def experience_retriever_by_destination(
+        self,
+        query_string: str,
+        destination_ids: List[str],
+        top_k_per_dest: int = 7
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Retrieve the top experiences of several destinations with one query.
         
-        for i, (doc, score) in enumerate(results_with_scores, 1):
-            score_color = Colors.GREEN if score > 0.45 else Colors.YELLOW if score > 0.35 else Colors.END
-            exp_name = doc['experience_name']
-            exp_id = doc['experience_id']
-            print(f"      {i}. {exp_name} ({exp_id}) - {score_color}Score: {score:.3f}{Colors.END}")
+        The query is embedded once and scored against the experience index in
+        a single pass; the scores are then split by each destination's
+        precomputed rows. Equivalent to calling experience_retriever once per
+        destination.
         
-        return results
+        Args:
+            query_string: Natural language query for semantic search
+            destination_ids: Destinations to retrieve experiences for
+            top_k_per_dest: Number of results to return per destination
+        
+        Returns:
+            Dict mapping each destination ID to its experience dossiers
+        """
+        if self.experience_index is None:
+            raise RuntimeError("Experience index not loaded. Call load_indexes() first.")
+        
+        index = self.experience_index
+        query_embedding = self._embed_query(query_string, "RETRIEVAL_QUERY")[None, :]
+        rows_by_dest = {d: self._exp_by_dest.get(d, _NO_ROWS) for d in destination_ids}
+        
+        if self._ann_indexes.get(index.metadata.get('index_type')) is not None:
+            # The graph search takes the row filter itself
+            results_by_dest = {
+                d: self._search_batch(query_embedding, index, top_k_per_dest, rows=rows)[0]
+                for d, rows in rows_by_dest.items()
+            }
+        else:
+            similarities = self._score(query_embedding, index)
+            results_by_dest = {
+                d: self._top_k_results(similarities, index, top_k_per_dest, rows)[0]
+                if len(rows) and top_k_per_dest > 0 else []
+                for d, rows in rows_by_dest.items()
+            }
+        
+        # Debug: Log scores per destination (skipped entirely unless DEBUG is on)
+        if logger.isEnabledFor(logging.DEBUG):
+            display_query = _format_query_for_display(query_string, max_length=80)
+            lines = [
+                f"\n{Colors.MAGENTA}🎯 RAG: Experience Search for {', '.join(destination_ids)}{Colors.END}",
+                f"   {Colors.YELLOW}{display_query}{Colors.END}",
+            ]
+            for dest_id, results_with_scores in results_by_dest.items():
+                lines.append(f"   {Colors.GREEN}→ {dest_id}: Top {len(results_with_scores)} Experiences:{Colors.END}")
+                for i, (doc, score) in enumerate(results_with_scores, 1):
+                    score_color = Colors.GREEN if score > 0.45 else Colors.YELLOW if score > 0.35 else Colors.END
+                    lines.append(f"      {i}. {doc['experience_name']} ({doc['experience_id']}) - {score_color}Score: {score:.3f}{Colors.END}")
+            logger.debug("\n".join(lines))
+        
+        return {
+            dest_id: [doc for doc, score in results_with_scores]
+            for dest_id, results_with_scores in results_by_dest.items()
+        }
 
 
 # Convenience function for direct usage
-def create_retriever(index_dir: str = "vector_indexes", api_key: Optional[str] = None):
+def create_retriever(
+    index_dir: str = "vector_indexes",
+    api_key: Optional[str] = None,
+    query_cache_path: Optional[str] = None
+):
     """
     Create and initialize a SemanticRetriever with loaded indexes.
     
     Args:
         index_dir: Path to directory containing vector indexes
         api_key: Gemini API key (optional, will use GEMINI_API_KEY env var if not provided)
+        query_cache_path: Optional on-disk cache for query embeddings, so they
+            survive process restarts (the in-memory LRU is always on)
     
     Returns:
         Initialized SemanticRetriever instance
@@ -300,7 +732,7 @@ def create_retriever(index_dir: str = "vector_indexes", api_key: Optional[str] =
     from build_vector_index import EmbeddingGenerator
     
     # Initialize embedding generator
-    embedding_gen = EmbeddingGenerator(api_key=api_key)
+    embedding_gen = EmbeddingGenerator(api_key=api_key, cache_path=query_cache_path)
     
     # Create retriever and load indexes
     retriever = SemanticRetriever(embedding_gen)
@@ -311,6 +743,10 @@ def create_retriever(index_dir: str = "vector_indexes", api_key: Optional[str] =
 
 # Example usage
 if __name__ == "__main__":
+    # Show the per-query score breakdowns in test mode
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    logger.setLevel(logging.DEBUG)
+    
     print("\n🔍 RAG Retrieval Engine - Test Mode\n")
     
     # Get the script directory
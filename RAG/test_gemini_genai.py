@@ -21,6 +21,8 @@ import argparse
 import sys
 from typing import Optional
 
+from db_fields import EXP_KEYS_TO_FILL, find_missing_fields
+
 ROOT = os.path.dirname(os.path.dirname(__file__))
 EXP_PATH = os.path.join(ROOT, "RAG", "experience_db.json")
 PROMPT_PATH = os.path.join(ROOT, "RAG", "prompts", "llm_fill_experience.txt")
@@ -36,40 +38,6 @@ def load_prompt(path: str) -> str:
         return f.read()
 
 
-def find_missing_fields(entry, keys_to_check):
-    miss = []
-    for k in keys_to_check:
-        v = entry.get(k, None)
-        if v is None or (isinstance(v, str) and v.strip() == "") or (isinstance(v, list) and len(v) == 0):
-            miss.append(k)
-    return miss
-
-
-EXP_KEYS_TO_FILL = [
-    "package_type",
-    "one_line_pitch",
-    "semantic_profile",
-    "semantic_antiprofile",
-    "primary_preference_tag",
-    "secondary_preference_tags",
-    "vibe_tags",
-    "cost_tier",
-    "duration_type",
-    "physical_intensity",
-    "logistics_model",
-    "package_inclusions",
-    "booking_lead_time_warning",
-    "event_details",
-    "itinerary_role",
-    "itinerary_pitch_text",
-    "hesitation_analyzer",
-    "conflict_solver",
-    "competing_experience_ids",
-    "upsell_opportunity_ids",
-    "planner_memo",
-]
-
-
 def build_prompt(entry, missing, web_text: Optional[str]):
     template = load_prompt(PROMPT_PATH)
     entry_json = json.dumps(entry, indent=2, ensure_ascii=False)
@@ -2,9 +2,25 @@
 Shared data structures for the RAG vector index system.
 """
 
+import json
 import numpy as np
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+
+def read_json(path: Union[str, Path]) -> Any:
+    """Read a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 
 @dataclass
@@ -13,20 +29,176 @@ class VectorIndex:
     embeddings: np.ndarray  # Shape: (n_documents, embedding_dim)
     documents: List[Dict[str, Any]]  # Original document data
     metadata: Dict[str, Any]  # Index metadata (model info, timestamp, etc.)
+    scales: Optional[np.ndarray] = None  # Per-row int8 scales, shape (n_documents,)
+    half_sq_norms: Optional[np.ndarray] = None  # 0.5 * ||row||^2, shape (n_documents,)
+    columns: Optional[Dict[str, np.ndarray]] = None  # Per-key document columns, see column()
     
+    def column(self, key: str) -> np.ndarray:
+        """
+        Return documents[i].get(key) for every document as an object array.
+
+        Columns are built on first use and kept, so hot keys (ids used for
+        filtering and lookup) can be matched with NumPy (==, np.isin) instead
+        of walking the list of dicts on every call.
+        """
+        if self.columns is None:
+            self.columns = {}
+        if key not in self.columns:
+            values = np.empty(len(self.documents), dtype=object)
+            values[:] = [doc.get(key) for doc in self.documents]
+            self.columns[key] = values
+        return self.columns[key]
+
+    def compute_half_sq_norms(self) -> np.ndarray:
+        """
+        Return 0.5 * ||row||^2 for every embedding row.
+
+        With these precomputed, ||p - q||^2 / 2 = half_sq_norms[p] + 0.5 * ||q||^2 - p.q
+        and ||p|| = sqrt(2 * half_sq_norms[p]), so neither L2 distance nor
+        cosine needs a per-query pass over the rows to get their norms.
+        """
+        if self.half_sq_norms is not None:
+            return self.half_sq_norms
+        embeddings = np.asarray(self.embeddings, dtype=np.float32)
+        return (0.5 * np.einsum('ij,ij->i', embeddings, embeddings)).astype(np.float32)
+
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for serialization."""
-        return {
-            'embeddings': self.embeddings.tolist(),
+        """
+        Convert to dictionary for serialization.
+
+        Arrays are stored as raw bytes plus shape (no per-float Python
+        objects); use `save` for on-disk indexes.
+        """
+        embeddings = np.ascontiguousarray(self.embeddings)
+        data = {
+            'embeddings': embeddings.tobytes(),
+            'embeddings_shape': list(embeddings.shape),
+            'embeddings_dtype': embeddings.dtype.str,
             'documents': self.documents,
             'metadata': self.metadata
         }
-    
+        if self.scales is not None:
+            data['scales'] = np.ascontiguousarray(self.scales, dtype=np.float32).tobytes()
+        return data
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'VectorIndex':
-        """Load from dictionary."""
+        """Load from dictionary (raw-bytes form from `to_dict`, or nested lists)."""
+        dtype = np.int8 if 'scales' in data else np.float32
+        embeddings = data['embeddings']
+        if isinstance(embeddings, (bytes, bytearray, memoryview)):
+            embeddings = np.frombuffer(embeddings, dtype=data.get('embeddings_dtype', dtype))
+            embeddings = embeddings.reshape(data['embeddings_shape'])
+
+        scales = data.get('scales')
+        if isinstance(scales, (bytes, bytearray, memoryview)):
+            scales = np.frombuffer(scales, dtype=np.float32)
+
         return cls(
-            embeddings=np.array(data['embeddings']),
+            embeddings=np.ascontiguousarray(embeddings, dtype=dtype),
             documents=data['documents'],
-            metadata=data['metadata']
+            metadata=data['metadata'],
+            scales=np.array(scales, dtype=np.float32) if scales is not None else None
+        )
+
+    def quantize_int8(self) -> 'VectorIndex':
+        """
+        Return a copy of this index with int8 embeddings.
+
+        Uses per-row symmetric quantization: each row is multiplied by
+        127 / max(|row|) and rounded, and that factor is kept in `scales` so a
+        dot product against a row can be rescaled with `score / scales[i]`.
+        """
+        embeddings = np.asarray(self.embeddings, dtype=np.float32)
+        max_abs = np.abs(embeddings).max(axis=1)
+        scales = (127.0 / np.clip(max_abs, 1e-12, None)).astype(np.float32)
+        quantized = np.round(embeddings * scales[:, None]).astype(np.int8)
+
+        return VectorIndex(
+            embeddings=quantized,
+            documents=self.documents,
+            metadata={**self.metadata, 'dtype': 'int8', 'quant': 'per_row_symmetric'},
+            scales=scales,
+            half_sq_norms=self.compute_half_sq_norms()
+        )
+
+    def to_blocked(self, width: int = 16) -> np.ndarray:
+        """
+        Return the embeddings in a blocked (N/W, D, W) layout.
+
+        Rows are zero-padded up to a multiple of `width` and each block of W
+        rows is transposed, so one contiguous W-wide load reads the same
+        coordinate from W candidates (8 float32 lanes for AVX2, 16 for
+        AVX-512). Padding rows are all zero.
+        """
+        n, dim = self.embeddings.shape
+        pad = (-n) % width
+        padded = np.zeros((n + pad, dim), dtype=self.embeddings.dtype)
+        padded[:n] = self.embeddings
+        return np.ascontiguousarray(padded.reshape(-1, width, dim).transpose(0, 2, 1))
+
+    def save(self, path: Union[str, Path]):
+        """
+        Save the index as `<path>.npy` (embeddings) plus a `<path>.json` sidecar.
+
+        The embeddings are written as a C-contiguous float32 array (or int8 for
+        a quantized index, with the row scales in `<path>.scales.npy`) so they
+        can be memory-mapped on load; documents and metadata go in the sidecar.
+        Half squared row norms are written to `<path>.half_sq_norms.npy`, and
+        if metadata['block_width'] is set, a blocked copy of the embeddings
+        (see `to_blocked`) is written to `<path>.blocked.npy`; otherwise an
+        older blocked copy is removed, since its rows would no longer match.
+
+        Args:
+            path: Target path without extension, e.g. vector_indexes/destination_index
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.scales is not None:
+            np.save(path.with_suffix('.npy'), np.ascontiguousarray(self.embeddings, dtype=np.int8))
+            np.save(path.with_suffix('.scales.npy'), np.ascontiguousarray(self.scales, dtype=np.float32))
+        else:
+            np.save(path.with_suffix('.npy'), np.ascontiguousarray(self.embeddings, dtype=np.float32))
+        np.save(path.with_suffix('.half_sq_norms.npy'), self.compute_half_sq_norms())
+        if self.metadata.get('block_width'):
+            np.save(path.with_suffix('.blocked.npy'), self.to_blocked(self.metadata['block_width']))
+        elif path.with_suffix('.blocked.npy').exists():
+            path.with_suffix('.blocked.npy').unlink()
+        sidecar = {'metadata': self.metadata, 'documents': self.documents}
+        if orjson is not None:
+            with open(path.with_suffix('.json'), 'wb') as f:
+                f.write(orjson.dumps(sidecar))
+        else:
+            with open(path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+                json.dump(sidecar, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap_mode: Optional[str] = 'r') -> 'VectorIndex':
+        """
+        Load an index written by `save`.
+
+        Args:
+            path: Index path without extension
+            mmap_mode: Passed to np.load; 'r' maps the embeddings read-only
+                instead of reading them into memory. Use None to load eagerly.
+        """
+        path = Path(path)
+        embeddings = np.load(path.with_suffix('.npy'), mmap_mode=mmap_mode)
+        sidecar = read_json(path.with_suffix('.json'))
+
+        scales = None
+        if sidecar['metadata'].get('dtype') == 'int8':
+            scales = np.load(path.with_suffix('.scales.npy'), mmap_mode=mmap_mode)
+
+        half_sq_norms = None
+        if path.with_suffix('.half_sq_norms.npy').exists():
+            half_sq_norms = np.load(path.with_suffix('.half_sq_norms.npy'), mmap_mode=mmap_mode)
+
+        return cls(
+            embeddings=embeddings,
+            documents=sidecar['documents'],
+            metadata=sidecar['metadata'],
+            scales=scales,
+            half_sq_norms=half_sq_norms
         )
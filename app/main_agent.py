@@ -13,9 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import os
+import re
 
-import google.auth
 from typing import AsyncGenerator, ClassVar, List
 
 from google.adk.agents import LlmAgent, Agent, LoopAgent, BaseAgent
@@ -28,6 +29,7 @@ from google.genai import types as genai_types
 from app.question_generator import QuestionGeneratorAgent
 # Use the RAG-powered ExperiencePlanningAgent
 from app.experience_planner import ExperiencePlanningAgent
+from app.vertex_init import _ensure_vertex_initialized
 
 # Prefer an explicit Gemini (Generative Language) endpoint + API key when provided.
 # If `GEMINI_API_KEY` is present in the environment, configure
@@ -43,18 +45,45 @@ if GEMINI_API_KEY:
         os.environ["GEMINI_ENDPOINT"] = GEMINI_ENDPOINT
     # Tell ADK to prefer the Generative Language endpoint instead of Vertex.
     os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "False")
-else:
-    # Fallback to Vertex AI initialization for existing setups.
-    try:
-        from google.cloud import aiplatform
-        aiplatform.init(project='triumph-in-the-skies', location='us-central1')
-        _, project_id = google.auth.default()
-        os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "triumph-in-the-skies")
-        os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "us-central1")
-        os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
-    except Exception as e:
-        print(f"Warning: Could not initialize Vertex AI: {e}")
-        print("Please set GEMINI_API_KEY environment variable or configure Google Cloud credentials.")
+
+# User reply to a quiz question: "A" or "A|2.5" (answer|hesitation_seconds)
+_ANSWER_RE = re.compile(r"^\s*([ABab])\s*(?:\|\s*([0-9]+(?:\.[0-9]+)?))?\s*$")
+
+# Templates of the plan response, bound once instead of re-parsing f-strings per item
+_PLAN_HEADER = "🎉 I've created a personalized travel plan for you!\n"
+_DEST_FMT = "\n📍 Destination {i}: {name}\n   {summary}\n   Cost Level: {cost}/5".format
+_EXPERIENCES_HEADER = "\n   ✨ Recommended Experiences:"
+_EXP_FMT = "   {j}. {title} ({role})".format
+
+
+def _plan_response_blocks(destinations: List[dict]) -> List[str]:
+    """
+    Render a SUCCESS plan as chat message chunks: a header, then one block per
+    destination (top 3 experiences each). Concatenated, the chunks form the
+    full plan message.
+    """
+    blocks = [_PLAN_HEADER]
+    for i, dest in enumerate(destinations, 1):
+        # Keys guaranteed by ExperiencePlanningAgent._format_plan_output
+        lines = [_DEST_FMT(
+            i=i,
+            name=dest["name"],
+            summary=dest["summary"],
+            cost=dest["cost_index"]
+        )]
+        experiences = dest.get("experiences") or ()
+        if experiences:
+            lines.append(_EXPERIENCES_HEADER)
+            lines.extend(
+                _EXP_FMT(j=j, title=exp["title"], role=exp["role"])
+                for j, exp in enumerate(experiences[:3], 1)
+            )
+        blocks.append("\n" + "\n".join(lines))
+    return blocks
+
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected
+_background_tasks = set()
 
 # Instantiate the agents
 question_generator_agent = QuestionGeneratorAgent()
@@ -75,14 +104,17 @@ class TravelPlanningOrchestrator(BaseAgent):
         super().__init__(name=name)
     
     def _get_question_agent(self) -> QuestionGeneratorAgent:
-        """Get or create QuestionGeneratorAgent instance."""
-        return QuestionGeneratorAgent()
+        """Get the shared QuestionGeneratorAgent instance (keeps its Gemini client)."""
+        return question_generator_agent
     
     def _get_planner_agent(self) -> ExperiencePlanningAgent:
-        """Get or create ExperiencePlanningAgent instance."""
-        return ExperiencePlanningAgent()
+        """Get the shared ExperiencePlanningAgent instance."""
+        return experience_planning_agent
     
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        # The question agent's Gemini client needs the Vertex environment
+        _ensure_vertex_initialized()
+        
         state = ctx.session.state
         
         # Extract user's latest message from user_content
@@ -98,22 +130,28 @@ class TravelPlanningOrchestrator(BaseAgent):
                         break
         
         # Parse answer and hesitation from user input
-        # Format: "A|2.0" or just "A"
-        if user_text:
-            parts = user_text.split('|')
-            answer = parts[0].strip().upper()
-            hesitation = float(parts[1]) if len(parts) > 1 else 2.0
-            
-            if answer in ['A', 'B']:
-                state['submitted_answer'] = {
-                    'answer': answer,
-                    'hesitation_seconds': hesitation
-                }
+        # Format: "A|2.0" or just "A"; anything else is not an answer
+        match = _ANSWER_RE.match(user_text) if user_text else None
+        if match:
+            answer, hesitation = match.groups()
+            state['submitted_answer'] = {
+                'answer': answer.upper(),
+                'hesitation_seconds': float(hesitation) if hesitation else 2.0
+            }
         
         # Get agent instances
         question_agent = self._get_question_agent()
         planner_agent = self._get_planner_agent()
         
+        # Once the quiz is under way, load the planner's RAG indexes in the
+        # background while the question agent runs (a no-op once loaded)
+        prefetch = None
+        if state.get('submitted_answer') and not state.get('plan_ready'):
+            prefetch = asyncio.create_task(planner_agent.prefetch())
+            _background_tasks.add(prefetch)
+            prefetch.add_done_callback(_background_tasks.discard)
+            await asyncio.sleep(0)
+        
         # Step 1: Let QuestionGeneratorAgent process and yield its events
         # This will show questions to the user
         async for event in question_agent.run_async(ctx):
@@ -122,10 +160,15 @@ class TravelPlanningOrchestrator(BaseAgent):
         
         # Step 2: Check if we have a profile ready for planning
         if state.get("user_travel_profile") and state.get("part") == "profile_generated":
-            # Profile is ready, run the experience planner
-            async for event in planner_agent.run_async(ctx):
-                # Yield planner events too
-                yield event
+            # Profile is ready, run the experience planner (unless a plan is
+            # already in place, e.g. a precomputed Part1 plan)
+            if not state.get("plan_ready"):
+                # Let a prefetch still loading the indexes finish first
+                if prefetch is not None:
+                    await prefetch
+                async for event in planner_agent.run_async(ctx):
+                    # Yield planner events too
+                    yield event
             
             # Check planning result
             planning_result = state.get("experience_planning_result")
@@ -134,31 +177,26 @@ class TravelPlanningOrchestrator(BaseAgent):
                 
                 if status == "SUCCESS":
                     # Format and return the plan
-                    destinations = planning_result.get("data", [])
-                    
-                    # Create response message
-                    response_parts = [
-                        "🎉 I've created a personalized travel plan for you!\n"
-                    ]
-                    
-                    for i, dest in enumerate(destinations, 1):
-                        response_parts.append(f"\n📍 Destination {i}: {dest.get('name')}")
-                        response_parts.append(f"   {dest.get('summary')}")
-                        response_parts.append(f"   Cost Level: {dest.get('cost_index')}/5")
-                        
-                        experiences = dest.get("experiences", [])
-                        if experiences:
-                            response_parts.append(f"\n   ✨ Recommended Experiences:")
-                            for j, exp in enumerate(experiences[:3], 1):  # Show top 3
-                                response_parts.append(f"   {j}. {exp.get('title')} ({exp.get('role')})")
-                    
-                    response_text = "\n".join(response_parts)
+                    destinations = planning_result["data"]
                     
+                    # Stream the plan one destination at a time as partial
+                    # events, then send the whole message as the final event
+                    # (the one ADK keeps in the session history)
+                    blocks = _plan_response_blocks(destinations)
+                    for block in blocks:
+                        yield Event(
+                            author=self.name,
+                            partial=True,
+                            content=genai_types.Content(
+                                role="model",
+                                parts=[genai_types.Part.from_text(text=block)]
+                            )
+                        )
                     yield Event(
                         author=self.name,
                         content=genai_types.Content(
                             role="model",
-                            parts=[genai_types.Part.from_text(text=response_text)]
+                            parts=[genai_types.Part.from_text(text="".join(blocks))]
                         )
                     )
                     return
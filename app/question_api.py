@@ -1,16 +1,29 @@
+import asyncio
+import functools
+import hashlib
 import uuid
 import time
 import os
+import weakref
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Dict, List, Optional, Tuple
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 
 from app.question_generator import QuestionGeneratorAgent
 from app.experience_planner import ExperiencePlanningAgent
+from app.rag_tools import get_rag_toolkit
+from app.session_store import create_session_store
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # ANSI color codes for terminal output
 class Colors:
@@ -33,9 +46,116 @@ def print_error(message: str):
     """Print ERROR message in red."""
     print(f"{Colors.RED}ERROR:{Colors.END} {message}")
 
+# Separator lines used in the session logs
+SEP = "=" * 70 + "\n"
+SUBSEP = "-" * 70 + "\n"
+
+# Per-session log files in OUTPUT_DIR; set ENABLE_LOGS=0 to turn them off
+ENABLE_SESSION_LOGS = os.getenv("ENABLE_LOGS", "1").lower() not in ("0", "false", "no")
+
 # Output directory for session logs
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
-OUTPUT_DIR.mkdir(exist_ok=True)
+if ENABLE_SESSION_LOGS:
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+# Session log templates, built once; each request formats one block per write
+LOG_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+SESSION_HEADER_TMPL = (
+    SEP + "HK EXPRESS - TRAVEL PREFERENCE QUIZ SESSION\n" + SEP
+    + "Session ID: {sid}\nUser: {user}\nStart Time: {start}\nISO Time: {iso}\n"
+    + SEP + "\nSession initialized. Waiting for user responses...\n\n"
+)
+ANSWER_TMPL = (
+    "Question #{n}\n  Question: {question}\n  Answer: {answer}\n"
+    "  Hesitation: {hesitation:.2f} seconds\n  Timestamp: {timestamp}\n\n"
+)
+QA_HISTORY_TMPL = "{n}. Question: {question}\n   Answer: {answer}\n   Hesitation: {hesitation:.2f}s\n\n"
+PLAN_HEADER_TMPL = "\n" + SEP + "EXPERIENCE PLANNING RESULTS\n" + SEP + "Timestamp: {timestamp}\nStatus: {status}\n\n"
+PLAN_DEST_TMPL = (
+    SUBSEP + "DESTINATION {n}: {name}\n" + SUBSEP
+    + "  Summary: {summary}\n  Cost Index: {cost}/5\n  Archetype: {archetype}\n\n"
+)
+PLAN_EXP_TMPL = "    {n}. {title}\n       Role: {role}\n       Duration: {duration}\n       Cost: {cost}\n"
+
+# Last formatted log timestamp: [whole second, text]
+_LAST_LOG_TIME = [0, ""]
+
+
+def log_time_now() -> str:
+    """Current local time in LOG_TIME_FORMAT, reformatted only when the second changes."""
+    now = int(time.time())
+    if now != _LAST_LOG_TIME[0]:
+        _LAST_LOG_TIME[0] = now
+        _LAST_LOG_TIME[1] = time.strftime(LOG_TIME_FORMAT, time.localtime(now))
+    return _LAST_LOG_TIME[1]
+
+
+# Session log entries (log_file, text, mode), written off the request path by
+# _log_writer: entries queued within LOG_FLUSH_SECONDS of each other are
+# grouped per file and written with one open/write/close per file, in order
+LOG_QUEUE: "asyncio.Queue[Optional[Tuple[Path, str, str]]]" = asyncio.Queue()
+LOG_FLUSH_SECONDS = 0.5
+LOG_BATCH_SIZE = 256
+
+
+def queue_log_write(log_file: Path, text: str, mode: str = 'a'):
+    """Queue text for a session log; never blocks the caller."""
+    if ENABLE_SESSION_LOGS:
+        LOG_QUEUE.put_nowait((log_file, text, mode))
+
+
+def _session_log_file(state: Dict) -> Path:
+    """Log file of a session, as recorded in its state at creation."""
+    log_file = state.get("log_file")
+    if log_file is None:
+        # Session created before log paths were stored
+        log_file = state["log_file"] = str(OUTPUT_DIR / f"session_{state['session_id']}.txt")
+    return Path(log_file)
+
+
+def _write_log_batch(batch: List[Tuple[Path, str, str]]):
+    """Write queued log entries, opening each file once."""
+    grouped: Dict[Path, Tuple[str, List[str]]] = {}
+    for log_file, text, mode in batch:
+        if mode == 'w' or log_file not in grouped:
+            # A 'w' truncates the file, so anything queued before it is moot
+            grouped[log_file] = (mode, [text])
+        else:
+            grouped[log_file][1].append(text)
+    for log_file, (mode, parts) in grouped.items():
+        with open(log_file, mode, encoding='utf-8') as f:
+            f.write("".join(parts))
+
+
+async def _log_writer():
+    """Drain LOG_QUEUE in batches until a None sentinel arrives."""
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        entry = await LOG_QUEUE.get()
+        batch = []
+        if entry is None:
+            stopping = True
+        else:
+            batch.append(entry)
+            deadline = loop.time() + LOG_FLUSH_SECONDS
+            while len(batch) < LOG_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(LOG_QUEUE.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is None:
+                    stopping = True
+                    break
+                batch.append(entry)
+        if batch:
+            try:
+                await asyncio.to_thread(_write_log_batch, batch)
+            except Exception as e:
+                print_error(f"Could not write session logs: {e}")
 
 
 class AnswerPayload(BaseModel):
@@ -43,7 +163,11 @@ class AnswerPayload(BaseModel):
     hesitation_seconds: float
 
 
-app = FastAPI(title="Question Generator API")
+# orjson encodes responses (notably the full session state) much faster
+app = FastAPI(
+    title="Question Generator API",
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse,
+)
 
 # Add CORS middleware to allow frontend requests
 app.add_middleware(
@@ -54,8 +178,55 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Simple in-memory session store. Keys are session ids.
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+# Session state by session id: Redis when REDIS_URL is set (shared across
+# workers), otherwise in-memory; idle sessions expire either way
+SESSIONS = create_session_store()
+
+
+# SUCCESS plans by profile, shared across sessions (LRU): quiz profiles are
+# fixed-form text, so identical profiles are common and skip the planner
+PLAN_CACHE: "OrderedDict[str, Dict]" = OrderedDict()
+PLAN_CACHE_SIZE = 1024
+
+
+def _plan_cache_key(profile: str) -> str:
+    """Digest of the profile with case and whitespace normalized."""
+    normalized = " ".join(profile.lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# One lock per session id, held while an endpoint reads, steps and saves the
+# session, so racing requests (e.g. frontend retries) can't interleave and
+# run the agent twice on the same state. Entries vanish once no request holds
+# them. Per process only: with several workers, route a session to one worker.
+SESSION_LOCKS: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def session_locked(endpoint):
+    """Run a session endpoint while holding that session's lock."""
+    @functools.wraps(endpoint)
+    async def wrapper(session_id: str, *args, **kwargs):
+        lock = SESSION_LOCKS.get(session_id)
+        if lock is None:
+            lock = SESSION_LOCKS[session_id] = asyncio.Lock()
+        async with lock:
+            return await endpoint(session_id, *args, **kwargs)
+    return wrapper
+
+
+async def load_session(session_id: str) -> Dict:
+    """Return the session's state; 410 if it expired, 404 if it never existed."""
+    state = await SESSIONS.get(session_id)
+    if state is None:
+        if await SESSIONS.was_evicted(session_id):
+            raise HTTPException(
+                status_code=410,
+                detail="session expired",
+                headers={"X-Session-Expired": "true"}
+            )
+        raise HTTPException(status_code=404, detail="session not found")
+    return state
+
 
 # Instantiate the agents (kept in-process so langchain/LLM objects can be reused per server run)
 question_agent = QuestionGeneratorAgent()
@@ -72,6 +243,23 @@ async def startup_event():
         print("   Set GEMINI_API_KEY environment variable to enable LLM features.")
         print("   The API will use fallback default questions.")
         print("="*70 + "\n")
+    
+    app.state.log_writer = asyncio.create_task(_log_writer())
+    
+    # Load the vector indexes now so the first /plan request doesn't pay for it
+    try:
+        await asyncio.to_thread(get_rag_toolkit)
+    except Exception as e:
+        print_error(f"Could not preload RAG indexes: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Run on application shutdown."""
+    # Flush whatever session logs are still queued
+    LOG_QUEUE.put_nowait(None)
+    await app.state.log_writer
+    await SESSIONS.close()
 
 
 @app.get("/")
@@ -80,31 +268,37 @@ def root():
 
 
 @app.post("/session", status_code=201)
-def create_session() -> Dict[str, str]:
+async def create_session() -> Dict[str, str]:
     sid = str(uuid.uuid4())
+    # Read the clock once; every timestamp of this request derives from it
     start_time = datetime.now()
+    start_iso = start_time.isoformat()
     
     # Create session state
-    SESSIONS[sid] = {
+    state = {
         "qa_history": [], 
         "part": None,
         "session_id": sid,
-        "start_time": start_time.isoformat(),
-        "start_timestamp": time.time(),
+        "start_time": start_iso,
+        "start_timestamp": start_time.timestamp(),
+        # Derived once here; later requests read it back from the state
+        "log_file": str(OUTPUT_DIR / f"session_{sid}.txt"),
         "user_name": "Justin"  # Default user name
     }
     
     # Console log for demo
     print("\n" + "="*70)
-    print_info(f"User {SESSIONS[sid]['user_name']} Connected")
+    print_info(f"User {state['user_name']} Connected")
     print("="*70)
     
     # Initialize by stepping once so a pending question is set
     print_info("Generating First Question Based on User Background")
-    question_agent.step_state(SESSIONS[sid])
+    # step_state may call the LLM synchronously, so keep it off the event loop
+    await asyncio.to_thread(question_agent.step_state, state)
+    await SESSIONS.save(sid, state)
     
     # Show the first question in terminal
-    pending_q = SESSIONS[sid].get("pending_question", {})
+    pending_q = state.get("pending_question", {})
     if pending_q and isinstance(pending_q, dict):
         choices = pending_q.get("choices", [])
         if choices and len(choices) >= 2:
@@ -117,40 +311,37 @@ def create_session() -> Dict[str, str]:
     print("="*70)
     
     # Log session creation to file
-    log_file = OUTPUT_DIR / f"session_{sid}.txt"
-    with open(log_file, 'w', encoding='utf-8') as f:
-        f.write("="*70 + "\n")
-        f.write("HK EXPRESS - TRAVEL PREFERENCE QUIZ SESSION\n")
-        f.write("="*70 + "\n")
-        f.write(f"Session ID: {sid}\n")
-        f.write(f"User: {SESSIONS[sid]['user_name']}\n")
-        f.write(f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"ISO Time: {start_time.isoformat()}\n")
-        f.write("="*70 + "\n\n")
-        f.write("Session initialized. Waiting for user responses...\n\n")
+    log_file = _session_log_file(state)
+    queue_log_write(log_file, SESSION_HEADER_TMPL.format(
+        sid=sid,
+        user=state['user_name'],
+        start=start_time.strftime(LOG_TIME_FORMAT),
+        iso=start_iso
+    ), 'w')
     
     return {"session_id": sid}
 
 
 @app.get("/session/{session_id}/question")
-def get_question(session_id: str):
-    state = SESSIONS.get(session_id)
-    if state is None:
-        raise HTTPException(status_code=404, detail="session not found")
-    # Ensure agent processes current state and sets pending_question
-    question_agent.step_state(state)
-    pending = state.get("pending_question")
-    if not pending:
-        # nothing pending: return profile or summary
-        return {"pending_question": None, "user_travel_profile": state.get("user_travel_profile")}
-    return {"pending_question": pending}
+@session_locked
+async def get_question(session_id: str):
+    state = await load_session(session_id)
+    # A pure read: create_session and post_answer advance the agent. Only a
+    # session with neither a question nor a profile yet is stepped here (the
+    # session lock keeps parallel GETs from stepping it twice)
+    if not state.get("pending_question") and not state.get("user_travel_profile"):
+        await asyncio.to_thread(question_agent.step_state, state)
+        await SESSIONS.save(session_id, state)
+    return {
+        "pending_question": state.get("pending_question"),
+        "user_travel_profile": state.get("user_travel_profile")
+    }
 
 
 @app.post("/session/{session_id}/answer")
-def post_answer(session_id: str, payload: AnswerPayload):
-    state = SESSIONS.get(session_id)
-    if state is None:
-        raise HTTPException(status_code=404, detail="session not found")
+@session_locked
+async def post_answer(session_id: str, payload: AnswerPayload):
+    state = await load_session(session_id)
     
     user_name = state.get("user_name", "User")
     current_question = state.get("pending_question", {}).get("question_text", "")
@@ -167,16 +358,16 @@ def post_answer(session_id: str, payload: AnswerPayload):
     }
     
     # Log the answer to file
-    log_file = OUTPUT_DIR / f"session_{session_id}.txt"
+    log_file = _session_log_file(state)
     qa_count = len(state.get("qa_history", [])) + 1
     
-    with open(log_file, 'a', encoding='utf-8') as f:
-        f.write(f"Question #{qa_count}\n")
-        f.write(f"  Question: {current_question}\n")
-        f.write(f"  Answer: {payload.answer}\n")
-        f.write(f"  Hesitation: {payload.hesitation_seconds:.2f} seconds\n")
-        f.write(f"  Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write("\n")
+    queue_log_write(log_file, ANSWER_TMPL.format(
+        n=qa_count,
+        question=current_question,
+        answer=payload.answer,
+        hesitation=payload.hesitation_seconds,
+        timestamp=log_time_now()
+    ), 'a')
     
     # Advance agent
     print_info("Generating Next Question Based on Past Results")
@@ -190,7 +381,8 @@ def post_answer(session_id: str, payload: AnswerPayload):
     else:
         print_analysis("Moderate decision time - balanced consideration")
     
-    question_agent.step_state(state)
+    await asyncio.to_thread(question_agent.step_state, state)
+    await SESSIONS.save(session_id, state)
     
     # After stepping, return the new pending question (if any)
     pending = state.get("pending_question")
@@ -215,40 +407,50 @@ def post_answer(session_id: str, payload: AnswerPayload):
     
     # If profile was generated, log it
     if profile and state.get("part") == "profile_generated":
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write("="*70 + "\n")
-            f.write("QUIZ COMPLETED - TRAVEL PROFILE GENERATED\n")
-            f.write("="*70 + "\n")
-            f.write(f"End Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write(f"Total Questions: {len(state.get('qa_history', []))}\n")
-            
-            # Calculate total session time
-            start_ts = state.get("start_timestamp", time.time())
-            duration = time.time() - start_ts
-            f.write(f"Session Duration: {duration:.1f} seconds ({duration/60:.1f} minutes)\n")
-            
-            # Calculate average hesitation
-            qa_history = state.get("qa_history", [])
-            if qa_history:
-                avg_hesitation = sum(q.get('hesitation_seconds', 0) for q in qa_history) / len(qa_history)
-                f.write(f"Average Hesitation: {avg_hesitation:.2f} seconds\n")
-            
-            f.write("\n" + "-"*70 + "\n")
-            f.write("USER TRAVEL PROFILE:\n")
-            f.write("-"*70 + "\n")
-            f.write(f"{profile}\n")
-            f.write("\n" + "="*70 + "\n")
-            f.write("QUESTION & ANSWER HISTORY:\n")
-            f.write("="*70 + "\n\n")
-            
-            for i, qa in enumerate(qa_history, 1):
-                f.write(f"{i}. Question: {qa.get('question', 'N/A')}\n")
-                f.write(f"   Answer: {qa.get('answer', 'N/A')}\n")
-                f.write(f"   Hesitation: {qa.get('hesitation_seconds', 0):.2f}s\n\n")
-            
-            f.write("="*70 + "\n")
-            f.write("END OF SESSION\n")
-            f.write("="*70 + "\n")
+        end_ts = time.time()
+        qa_history = state.get("qa_history", [])
+        
+        parts = []
+        parts.append(SEP)
+        parts.append("QUIZ COMPLETED - TRAVEL PROFILE GENERATED\n")
+        parts.append(SEP)
+        parts.append(f"End Time: {datetime.fromtimestamp(end_ts).strftime(LOG_TIME_FORMAT)}\n")
+        parts.append(f"Total Questions: {len(qa_history)}\n")
+        
+        # Calculate total session time
+        duration = end_ts - state.get("start_timestamp", end_ts)
+        parts.append(f"Session Duration: {duration:.1f} seconds ({duration/60:.1f} minutes)\n")
+        
+        # Calculate average hesitation
+        if qa_history:
+            hesitation_sum = state.get("hesitation_sum")
+            if hesitation_sum is None:
+                hesitation_sum = sum(q.get('hesitation_seconds') or 0 for q in qa_history)
+            avg_hesitation = hesitation_sum / len(qa_history)
+            parts.append(f"Average Hesitation: {avg_hesitation:.2f} seconds\n")
+        
+        parts.append("\n" + SUBSEP)
+        parts.append("USER TRAVEL PROFILE:\n")
+        parts.append(SUBSEP)
+        parts.append(f"{profile}\n")
+        parts.append("\n" + SEP)
+        parts.append("QUESTION & ANSWER HISTORY:\n")
+        parts.append(SEP + "\n")
+        
+        parts.extend(
+            QA_HISTORY_TMPL.format(
+                n=i,
+                question=qa.get('question', 'N/A'),
+                answer=qa.get('answer', 'N/A'),
+                hesitation=qa.get('hesitation_seconds', 0)
+            )
+            for i, qa in enumerate(qa_history, 1)
+        )
+        
+        parts.append(SEP)
+        parts.append("END OF SESSION\n")
+        parts.append(SEP)
+        queue_log_write(log_file, "".join(parts), 'a')
         
         # Console log for profile completion
         print("="*70)
@@ -262,19 +464,16 @@ def post_answer(session_id: str, payload: AnswerPayload):
 
 
 @app.get("/session/{session_id}/state")
-def get_state(session_id: str):
-    state = SESSIONS.get(session_id)
-    if state is None:
-        raise HTTPException(status_code=404, detail="session not found")
+async def get_state(session_id: str):
+    state = await load_session(session_id)
     return state
 
 
 @app.post("/session/{session_id}/plan")
+@session_locked
 async def generate_plan(session_id: str):
     """Generate travel plan using Experience Planner agent."""
-    state = SESSIONS.get(session_id)
-    if state is None:
-        raise HTTPException(status_code=404, detail="session not found")
+    state = await load_session(session_id)
     
     user_name = state.get("user_name", "User")
     
@@ -288,6 +487,18 @@ async def generate_plan(session_id: str):
         print_info(f"Returning cached travel plan for {user_name}")
         return state.get("experience_planning_result")
     
+    # Another session with the same profile may already have a plan
+    cache_key = _plan_cache_key(profile)
+    cached_plan = PLAN_CACHE.get(cache_key)
+    if cached_plan is not None:
+        PLAN_CACHE.move_to_end(cache_key)
+        print_info(f"[cache] Plan cache hit for {user_name}'s profile")
+        state["experience_planning_result"] = cached_plan
+        state["plan_ready"] = True
+        await SESSIONS.save(session_id, state)
+        return cached_plan
+    print_info("[cache] Plan cache miss")
+    
     # Console log for demo
     print("="*70)
     print_info(f"Initiating Experience Planning for {user_name}")
@@ -306,9 +517,15 @@ async def generate_plan(session_id: str):
     print_info("Running Experience Planner Agent...")
     async for event in planner_agent._run_async_impl(mock_ctx):
         pass  # Let it update state
+    await SESSIONS.save(session_id, state)
     
     # Get the planning result
     planning_result = state.get("experience_planning_result", {})
+    if planning_result.get("status") == "SUCCESS":
+        PLAN_CACHE[cache_key] = planning_result
+        PLAN_CACHE.move_to_end(cache_key)
+        while len(PLAN_CACHE) > PLAN_CACHE_SIZE:
+            PLAN_CACHE.popitem(last=False)
     
     # Console log results
     if planning_result.get("status") == "SUCCESS":
@@ -326,44 +543,48 @@ async def generate_plan(session_id: str):
         print("="*70)
     
     # Log planning results to session file
-    log_file = OUTPUT_DIR / f"session_{session_id}.txt"
-    with open(log_file, 'a', encoding='utf-8') as f:
-        f.write("\n" + "="*70 + "\n")
-        f.write("EXPERIENCE PLANNING RESULTS\n")
-        f.write("="*70 + "\n")
-        f.write(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Status: {planning_result.get('status', 'UNKNOWN')}\n\n")
+    log_file = _session_log_file(state)
+    parts = [PLAN_HEADER_TMPL.format(
+        timestamp=log_time_now(),
+        status=planning_result.get('status', 'UNKNOWN')
+    )]
+    
+    if planning_result.get("status") == "SUCCESS":
+        destinations = planning_result.get("data", [])
+        parts.append(f"Destinations Found: {len(destinations)}\n\n")
         
-        if planning_result.get("status") == "SUCCESS":
-            destinations = planning_result.get("data", [])
-            f.write(f"Destinations Found: {len(destinations)}\n\n")
+        for i, dest in enumerate(destinations, 1):
+            parts.append(PLAN_DEST_TMPL.format(
+                n=i,
+                name=dest.get('name', 'Unknown'),
+                summary=dest.get('summary', 'N/A'),
+                cost=dest.get('cost_index', 'N/A'),
+                archetype=dest.get('archetype', 'N/A')
+            ))
             
-            for i, dest in enumerate(destinations, 1):
-                f.write(f"-"*70 + "\n")
-                f.write(f"DESTINATION {i}: {dest.get('name', 'Unknown')}\n")
-                f.write(f"-"*70 + "\n")
-                f.write(f"  Summary: {dest.get('summary', 'N/A')}\n")
-                f.write(f"  Cost Index: {dest.get('cost_index', 'N/A')}/5\n")
-                f.write(f"  Archetype: {dest.get('archetype', 'N/A')}\n\n")
-                
-                experiences = dest.get("experiences", [])
-                if experiences:
-                    f.write(f"  Experiences ({len(experiences)}):\n")
-                    for j, exp in enumerate(experiences, 1):
-                        f.write(f"    {j}. {exp.get('title', 'Unknown')}\n")
-                        f.write(f"       Role: {exp.get('role', 'N/A')}\n")
-                        f.write(f"       Duration: {exp.get('duration', 'N/A')}\n")
-                        f.write(f"       Cost: {exp.get('cost_tier', 'N/A')}\n")
-                        if exp.get('short_description'):
-                            f.write(f"       Description: {exp.get('short_description')[:100]}...\n")
-                        f.write("\n")
-                f.write("\n")
-        else:
-            f.write(f"Reason: {planning_result.get('message', 'No message provided')}\n")
-        
-        f.write("="*70 + "\n\n")
+            experiences = dest.get("experiences", [])
+            if experiences:
+                parts.append(f"  Experiences ({len(experiences)}):\n")
+                for j, exp in enumerate(experiences, 1):
+                    parts.append(PLAN_EXP_TMPL.format(
+                        n=j,
+                        title=exp.get('title', 'Unknown'),
+                        role=exp.get('role', 'N/A'),
+                        duration=exp.get('duration', 'N/A'),
+                        cost=exp.get('cost_tier', 'N/A')
+                    ))
+                    if exp.get('short_description'):
+                        parts.append(f"       Description: {exp.get('short_description')[:100]}...\n")
+                    parts.append("\n")
+            parts.append("\n")
+    else:
+        parts.append(f"Reason: {planning_result.get('message', 'No message provided')}\n")
+    
+    parts.append(SEP + "\n")
+    queue_log_write(log_file, "".join(parts), 'a')
     
     print(f"[SESSION] Planning completed for session: {session_id}")
-    print(f"[SESSION] Results saved to: {log_file}")
+    if ENABLE_SESSION_LOGS:
+        print(f"[SESSION] Results saved to: {log_file}")
     
     return planning_result
@@ -1,11 +1,18 @@
+import hashlib
 import json
-from typing import Any, Dict, List
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 from google.adk.agents import BaseAgent
 from google.adk.events import Event
 from google.adk.agents.invocation_context import InvocationContext
 from google.genai import types as genai_types
 
+from app.vertex_init import _ensure_vertex_initialized
+
 try:
     from google import genai
 except Exception:
@@ -65,6 +72,176 @@ DEFAULT_QUESTIONS = [
 ]
 
 
+# Precomputed plans for Part1 sessions that only saw DEFAULT_QUESTIONS (the
+# no-LLM path), keyed by the answers packed into an int (see _ANSWER_CODES).
+# Generated offline by scripts/build_part1_plans.py; the file is optional.
+PART1_PLANS_PATH = os.path.join(os.path.dirname(__file__), "part1_plans.json")
+
+# 2-bit code per accepted answer; answer i occupies bits 2i..2i+1
+_ANSWER_CODES = {"a": 0, "b": 1, "all good": 2, "all bad": 3}
+
+
+def encode_answers(answers: List[str]) -> int:
+    """Pack lowercased answers into an int, two bits per answer."""
+    bits = 0
+    for i, answer in enumerate(answers):
+        bits |= _ANSWER_CODES[answer] << (2 * i)
+    return bits
+
+
+def _question_text(choices: List[str]) -> str:
+    """Question text as recorded in qa_history for a pair of choices."""
+    return f"{choices[0]} / {choices[1]}"
+
+
+DEFAULT_QUESTION_TEXTS = tuple(_question_text(q["choices"]) for q in DEFAULT_QUESTIONS)
+
+
+def _load_part1_plans(path: str = PART1_PLANS_PATH) -> Dict[int, Dict[str, Any]]:
+    """Load the precomputed Part1 plan table, or return {} if absent or stale.
+
+    The file looks like {"questions": [...], "plans": {"a,b,...": plan}}; it is
+    ignored when its questions no longer match DEFAULT_QUESTIONS. Plans whose
+    key contains an unknown answer are skipped with a warning.
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception as e:
+        print(f"[Q-AGENT] Warning: Could not load {path}: {e}")
+        return {}
+    if tuple(data.get("questions", [])) != DEFAULT_QUESTION_TEXTS:
+        print(f"[Q-AGENT] Warning: {path} was built for other questions, ignoring it")
+        return {}
+    plans = {}
+    for key, plan in data.get("plans", {}).items():
+        try:
+            plans[encode_answers(key.split(","))] = plan
+        except KeyError:
+            print(f"[Q-AGENT] Warning: Skipping Part1 plan with unknown answers {key!r} in {path}")
+    return plans
+
+
+_PART1_PLANS = _load_part1_plans()
+
+
+def lookup_part1_plan(
+    qa_history: List[Dict[str, Any]],
+    answer_bits: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """Return the precomputed plan for this Part1 answer tuple, or None.
+
+    answer_bits is the session's running encode_answers() value; it is
+    recomputed from qa_history when not given.
+    """
+    if not _PART1_PLANS:
+        return None
+    if tuple(entry.get("question", "") for entry in qa_history) != DEFAULT_QUESTION_TEXTS:
+        return None
+    if answer_bits is None:
+        answer_bits = encode_answers([str(entry.get("answer", "")).lower() for entry in qa_history])
+    return _PART1_PLANS.get(answer_bits)
+
+
+def build_fallback_profile(qa_history: List[Dict[str, Any]]) -> str:
+    """Profile built straight from the Q&A when the LLM did not provide one."""
+    parts = []
+    for entry in qa_history:
+        q = entry.get("question", "")
+        a = entry.get("answer", "")
+        h = entry.get("hesitation_seconds", 0)
+        parts.append(f"{q} -> {a} ({h:.1f}s)")
+    profile = "; ".join(parts)
+    return f"User travel profile based on answers: {profile}"
+
+
+def _confidence_label(hesitation: float) -> str:
+    """Interpret a hesitation time the way the question prompt describes it."""
+    if hesitation < 1:
+        return "very confident"
+    elif hesitation < 2:
+        return "confident"
+    elif hesitation < 4:
+        return "somewhat uncertain"
+    return "very uncertain"
+
+
+class DecisionCache:
+    """Thread-safe TTL + LRU cache of LLM decisions keyed by conversation history.
+
+    Histories that differ only in exact hesitation seconds, not in the
+    confidence level they map to, share an entry, so e.g. every session's
+    first question and common answer paths skip the LLM.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(qa_history: List[Dict[str, Any]]) -> str:
+        canonical = [
+            (
+                entry.get("question", ""),
+                str(entry.get("answer", "")).lower(),
+                _confidence_label(entry.get("hesitation_seconds", 0)),
+            )
+            for entry in qa_history
+        ]
+        return hashlib.sha256(json.dumps(canonical).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(entry[1])
+
+    def put(self, key: str, decision: dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, dict(decision))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_decision_cache = DecisionCache()
+
+
+# One Gemini client per process, shared by every QuestionGeneratorAgent so
+# they all reuse its pooled keep-alive connections
+_gemini_client = None
+_gemini_client_initialized = False
+_gemini_client_lock = threading.Lock()
+
+
+def _get_shared_gemini_client():
+    """Create the Gemini client on first use; None if genai is unavailable or init fails."""
+    global _gemini_client, _gemini_client_initialized
+    if not _gemini_client_initialized:
+        with _gemini_client_lock:
+            if not _gemini_client_initialized:
+                if genai is not None:
+                    # Without GEMINI_API_KEY the client needs the Vertex
+                    # environment (project/location), which is set up lazily
+                    _ensure_vertex_initialized()
+                    try:
+                        _gemini_client = genai.Client()
+                    except Exception as e:
+                        print(f"[Q-AGENT] Warning: Could not initialize Gemini client: {e}")
+                        _gemini_client = None
+                _gemini_client_initialized = True
+    return _gemini_client
+
+
 class QuestionGeneratorAgent(BaseAgent):
     """Question generator implementing Part1 (three A/B questions) and Part2 dynamic follow-ups.
 
@@ -75,21 +252,22 @@ class QuestionGeneratorAgent(BaseAgent):
 
     def __init__(self, name: str = "QuestionGeneratorAgent") -> None:
         super().__init__(name=name)
-        # Lazy loading - don't initialize client until first use
-        self._gemini_client = None
-        self._client_initialized = False
 
     def _get_gemini_client(self):
-        """Get the Gemini client instance with lazy initialization."""
-        if not self._client_initialized:
-            self._client_initialized = True
-            if genai is not None:
-                try:
-                    self._gemini_client = genai.Client()
-                except Exception as e:
-                    print(f"[Q-AGENT] Warning: Could not initialize Gemini client: {e}")
-                    self._gemini_client = None
-        return self._gemini_client
+        """Get the process-wide Gemini client (created lazily on first use)."""
+        return _get_shared_gemini_client()
+
+    @staticmethod
+    def _fallback_decision(questions_asked: int, reasoning: str, end_reasoning: str) -> dict:
+        """Next DEFAULT_QUESTIONS entry, or end questioning once they are used up."""
+        if questions_asked < len(DEFAULT_QUESTIONS):
+            return {
+                "should_end": False,
+                "profile": None,
+                "choices": DEFAULT_QUESTIONS[questions_asked]["choices"],
+                "reasoning": reasoning
+            }
+        return {"should_end": True, "profile": None, "choices": None, "reasoning": end_reasoning}
 
     def _generate_next_question(self, qa_history: List[Dict[str, Any]]) -> dict:
         """Use LLM to generate the next personalized question based on conversation history.
@@ -106,41 +284,35 @@ class QuestionGeneratorAgent(BaseAgent):
                 - 'choices': list or None - new question choices if should_end is False
                 - 'reasoning': str - why this question was chosen
         """
+        questions_asked = len(qa_history)
         client = self._get_gemini_client()
         if client is None:
             # Fallback: use first default question if no LLM
-            if len(qa_history) < len(DEFAULT_QUESTIONS):
-                return {
-                    "should_end": False,
-                    "profile": None,
-                    "choices": DEFAULT_QUESTIONS[len(qa_history)]["choices"],
-                    "reasoning": "Default question (no LLM available)"
-                }
-            return {"should_end": True, "profile": None, "choices": None, "reasoning": "No LLM"}
+            return self._fallback_decision(questions_asked, "Default question (no LLM available)", "No LLM")
+
+        # Same history (up to hesitation within a confidence level) as an
+        # earlier session: reuse that decision instead of calling the LLM
+        cache_key = _decision_cache.make_key(qa_history)
+        cached = _decision_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
         # Build detailed history string
-        history_str = ""
+        history_lines = []
         for i, entry in enumerate(qa_history, 1):
             q = entry.get('question', 'N/A')
             a = entry.get('answer', 'N/A')
             h = entry.get('hesitation_seconds', 0)
             
             # Interpret hesitation
-            if h < 1:
-                confidence = "very confident"
-            elif h < 2:
-                confidence = "confident"
-            elif h < 4:
-                confidence = "somewhat uncertain"
-            else:
-                confidence = "very uncertain"
+            confidence = _confidence_label(h)
             
-            history_str += f"\n{i}. Q: {q}\n   Answer: {a} ({confidence}, {h:.1f}s hesitation)\n"
+            history_lines.append(f"\n{i}. Q: {q}\n   Answer: {a} ({confidence}, {h:.1f}s hesitation)\n")
+        history_str = "".join(history_lines)
 
         # Determine minimum questions needed
         min_questions = 7
         max_questions = 10
-        questions_asked = len(qa_history)
         
         prompt = (
             "You are an expert travel advisor conducting a preference interview. Your goal is to build a DEEP, "
@@ -229,14 +401,7 @@ class QuestionGeneratorAgent(BaseAgent):
             
             if not response or not response.text:
                 # Fallback to default question
-                if len(qa_history) < len(DEFAULT_QUESTIONS):
-                    return {
-                        "should_end": False,
-                        "profile": None,
-                        "choices": DEFAULT_QUESTIONS[len(qa_history)]["choices"],
-                        "reasoning": "LLM response failed, using default"
-                    }
-                return {"should_end": True, "profile": None, "choices": None, "reasoning": "LLM failed"}
+                return self._fallback_decision(questions_asked, "LLM response failed, using default", "LLM failed")
             
             result_text = response.text.strip()
             
@@ -255,45 +420,27 @@ class QuestionGeneratorAgent(BaseAgent):
             except Exception as e:
                 print(f"[Q-AGENT] JSON parse error: {e}")
                 # Fallback
-                if len(qa_history) < len(DEFAULT_QUESTIONS):
-                    return {
-                        "should_end": False,
-                        "profile": None,
-                        "choices": DEFAULT_QUESTIONS[len(qa_history)]["choices"],
-                        "reasoning": "JSON parse failed"
-                    }
-                return {"should_end": True, "profile": None, "choices": None, "reasoning": "Parse failed"}
+                return self._fallback_decision(questions_asked, "JSON parse failed", "Parse failed")
             
             # Validate structure
             if "should_end" in parsed:
-                return {
+                decision = {
                     "should_end": bool(parsed.get("should_end", False)),
                     "profile": parsed.get("profile"),
                     "choices": parsed.get("choices"),
                     "reasoning": parsed.get("reasoning", "No reasoning provided")
                 }
+                # Only real LLM decisions are cached, never fallbacks
+                _decision_cache.put(cache_key, decision)
+                return decision
             
             # Invalid structure, fallback
-            if len(qa_history) < len(DEFAULT_QUESTIONS):
-                return {
-                    "should_end": False,
-                    "profile": None,
-                    "choices": DEFAULT_QUESTIONS[len(qa_history)]["choices"],
-                    "reasoning": "Invalid structure"
-                }
-            return {"should_end": True, "profile": None, "choices": None, "reasoning": "Invalid"}
+            return self._fallback_decision(questions_asked, "Invalid structure", "Invalid")
             
         except Exception as e:
             print(f"[Q-AGENT] LLM error: {e}")
             # Fallback to default
-            if len(qa_history) < len(DEFAULT_QUESTIONS):
-                return {
-                    "should_end": False,
-                    "profile": None,
-                    "choices": DEFAULT_QUESTIONS[len(qa_history)]["choices"],
-                    "reasoning": f"Exception: {e}"
-                }
-            return {"should_end": True, "profile": None, "choices": None, "reasoning": "Exception"}
+            return self._fallback_decision(questions_asked, f"Exception: {e}", "Exception")
 
     def step_state(self, state: Dict[str, Any]) -> None:
         """Advance the provided session state by one API interaction.
@@ -321,7 +468,7 @@ class QuestionGeneratorAgent(BaseAgent):
                 # pending uses structured format
                 choices = pending.get("choices")
                 if choices and isinstance(choices, list) and len(choices) >= 2:
-                    question_text = f"{choices[0]} / {choices[1]}"
+                    question_text = _question_text(choices)
                 else:
                     question_text = str(choices) if choices else ""
             qa_entry = {
@@ -329,6 +476,12 @@ class QuestionGeneratorAgent(BaseAgent):
                 "answer": answer,
                 "hesitation_seconds": hesitation,
             }
+            # Running bitmask of the answers, the precomputed plan key
+            state["answer_bits"] = state.get("answer_bits", 0) | (
+                _ANSWER_CODES[normalized] << (2 * len(qa_history))
+            )
+            # Running total, so the session summary needn't rescan qa_history
+            state["hesitation_sum"] = state.get("hesitation_sum", 0.0) + (hesitation or 0)
             qa_history.append(qa_entry)
             state["qa_history"] = qa_history
             state.pop("pending_question", None)
@@ -341,17 +494,17 @@ class QuestionGeneratorAgent(BaseAgent):
             # End questioning and create profile
             if decision["profile"]:
                 state["user_travel_profile"] = decision["profile"]
+                state.pop("profile_from_answers", None)
             else:
                 # Fallback profile generation (shouldn't happen with good LLM prompt)
-                parts = []
-                for entry in qa_history:
-                    q = entry.get("question", "")
-                    a = entry.get("answer", "")
-                    h = entry.get("hesitation_seconds", 0)
-                    parts.append(f"{q} -> {a} ({h:.1f}s)")
-                profile = "; ".join(parts)
-                state["user_travel_profile"] = f"User travel profile based on answers: {profile}"
+                state["user_travel_profile"] = build_fallback_profile(qa_history)
+                state["profile_from_answers"] = True
             state["part"] = "profile_generated"
+            # Known Part1 answer tuple: skip the planner's RAG round-trips
+            precomputed = lookup_part1_plan(qa_history, state.get("answer_bits"))
+            if precomputed is not None:
+                state["experience_planning_result"] = precomputed
+                state["plan_ready"] = True
             return
         else:
             # Continue with LLM-generated question
@@ -376,6 +529,7 @@ class QuestionGeneratorAgent(BaseAgent):
                 else:
                     # Force end if we've exhausted defaults
                     state["user_travel_profile"] = "Travel profile based on limited information"
+                    state["profile_from_answers"] = True
                     state["part"] = "profile_generated"
                 return
 
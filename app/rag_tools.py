@@ -6,10 +6,13 @@ This module provides ADK-compatible tool functions that wrap the RAG retriever
 to enable the ExperiencePlanningAgent to search destinations and experiences.
 """
 
+import hashlib
 import os
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, Hashable, List, Optional
 
 # Add RAG directory to Python path
 RAG_DIR = Path(__file__).parent.parent / "RAG"
@@ -21,8 +24,19 @@ from rag_retriever import create_retriever
 class RAGToolkit:
     """Provides RAG retrieval tools for the ADK agent system."""
     
-    def __init__(self):
-        """Initialize the RAG retriever with vector indexes."""
+    def __init__(self, search_cache_size: int = 1024):
+        """
+        Initialize the RAG retriever with vector indexes.
+        
+        Args:
+            search_cache_size: Number of experience search results kept in the LRU
+        """
+        # Experience search results keyed by (query digest, destination(s), top_k);
+        # the indexes are fixed for the toolkit's lifetime, so entries never go stale
+        self._search_cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._search_cache_size = search_cache_size
+        self._search_cache_lock = threading.Lock()
+        
         # Get the RAG vector indexes directory
         index_dir = RAG_DIR / "vector_indexes"
         
@@ -37,6 +51,36 @@ class RAGToolkit:
             print(f"✗ Failed to initialize RAG Toolkit: {e}")
             raise
     
+    def _cached_search(self, key: Hashable, search: Callable[[], Any]) -> Any:
+        """Return the cached result for key, or run search() and cache it."""
+        with self._search_cache_lock:
+            if key in self._search_cache:
+                self._search_cache.move_to_end(key)
+                return self._search_cache[key]
+        result = search()
+        with self._search_cache_lock:
+            self._search_cache[key] = result
+            if len(self._search_cache) > self._search_cache_size:
+                self._search_cache.popitem(last=False)
+        return result
+    
+    @staticmethod
+    def _query_digest(query: str) -> bytes:
+        """Short fixed-size cache key for a (possibly long) query string."""
+        return hashlib.blake2b(query.encode('utf-8'), digest_size=16).digest()
+    
+    def embed_query(self, query: str):
+        """
+        Embed a query the same way the searches do (shares their query cache).
+        
+        Args:
+            query: Natural language query
+        
+        Returns:
+            Float32 numpy embedding vector
+        """
+        return self.retriever.embed_query(query)
+    
     def search_destinations(
         self,
         query: Optional[str] = None,
@@ -81,22 +125,57 @@ class RAGToolkit:
         Returns:
             List of experience dossiers with full metadata
         """
-        return self.retriever.experience_retriever(
-            query_string=query,
-            destination_id=destination_id,
-            top_k=top_k
+        results = self._cached_search(
+            (self._query_digest(query), destination_id, top_k),
+            lambda: self.retriever.experience_retriever(
+                query_string=query,
+                destination_id=destination_id,
+                top_k=top_k
+            )
+        )
+        return list(results)
+
+    
+    def search_experiences_batch(
+        self,
+        query: str,
+        destination_ids: List[str],
+        top_k_per_dest: int = 7
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Search experiences for several destinations with one query embedding.
+        
+        Args:
+            query: Natural language query describing desired experience characteristics
+            destination_ids: Destination IDs to search within
+            top_k_per_dest: Number of results to return per destination (default: 7)
+        
+        Returns:
+            Dict mapping each destination ID to its experience dossiers
+        """
+        results = self._cached_search(
+            (self._query_digest(query), tuple(destination_ids), top_k_per_dest),
+            lambda: self.retriever.experience_retriever_by_destination(
+                query_string=query,
+                destination_ids=destination_ids,
+                top_k_per_dest=top_k_per_dest
+            )
         )
+        return {dest_id: list(exps) for dest_id, exps in results.items()}
 
 
 # Global singleton instance
 _rag_toolkit = None
+_rag_toolkit_lock = threading.Lock()
 
 
 def get_rag_toolkit() -> RAGToolkit:
-    """Get or create the global RAG toolkit instance."""
+    """Get or create the global RAG toolkit instance (safe to call from several threads)."""
     global _rag_toolkit
     if _rag_toolkit is None:
-        _rag_toolkit = RAGToolkit()
+        with _rag_toolkit_lock:
+            if _rag_toolkit is None:
+                _rag_toolkit = RAGToolkit()
     return _rag_toolkit
 
 
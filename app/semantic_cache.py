@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Semantic cache for RAG planning results.
+
+Maps a user travel profile to the destinations and experiences retrieved for
+it, so a repeated or paraphrased profile skips the RAG round-trips. Lookups
+try an exact (normalized text) key first, then cosine similarity between the
+profile's query embedding and the embeddings of cached profiles. Profiles built
+from the quiz answers alone are only ever matched exactly, by answer tuple.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# (destinations, all_experiences) as retrieved by ExperiencePlanningAgent
+Payload = Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+class SemanticCache:
+    """Thread-safe, TTL + LRU bounded cache of RAG results keyed by profile."""
+
+    def __init__(
+        self,
+        threshold: float = 0.92,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600.0
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a semantic hit
+            max_entries: Entries kept before the least recently used is evicted
+            ttl_seconds: Lifetime of an entry
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, unit embedding or None, payload)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[np.ndarray], Payload]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(profile: str) -> str:
+        """Exact-match key: the profile with case and whitespace normalized."""
+        return " ".join(profile.lower().split())
+
+    @staticmethod
+    def make_answers_key(questions: Sequence[str], answer_bits: int) -> str:
+        """Exact-match key of a profile built from the quiz answers alone.
+
+        answer_bits packs two bits per answer (see
+        question_generator.encode_answers), so the question count and texts
+        are part of the key too.
+        """
+        digest = hashlib.blake2b("\n".join(questions).encode("utf-8"), digest_size=16).hexdigest()
+        return f"answers:{len(questions)}:{answer_bits}:{digest}"
+
+    def _evict_expired(self, now: float):
+        expired = [key for key, (expires_at, _, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get_exact(self, key: str) -> Optional[Payload]:
+        """Return the payload cached under key, or None."""
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def get_similar(self, embedding: np.ndarray) -> Optional[Payload]:
+        """Return the payload of the most similar cached profile above threshold, or None."""
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+        with self._lock:
+            self._evict_expired(time.monotonic())
+            keys = [key for key, (_, emb, _) in self._entries.items() if emb is not None]
+            if not keys:
+                return None
+            matrix = np.vstack([self._entries[key][1] for key in keys])
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            self._entries.move_to_end(keys[best])
+            return self._entries[keys[best]][2]
+
+    def put(self, key: str, embedding: Optional[np.ndarray], payload: Payload):
+        """Cache payload under key (and embedding, for semantic lookups)."""
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            embedding = embedding / (np.linalg.norm(embedding) + 1e-12)
+        with self._lock:
+            now = time.monotonic()
+            self._evict_expired(now)
+            self._entries[key] = (now + self.ttl_seconds, embedding, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Similarity threshold of the global cache; lower it (e.g. 0.90) to let more
+# paraphrased profiles share RAG results
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+# Global singleton instance
+_semantic_cache = None
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Get or create the global semantic cache instance."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        _semantic_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD)
+    return _semantic_cache
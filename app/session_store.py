@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Session state storage for the Question API.
+
+Sessions live in Redis when `REDIS_URL` is set (and the `redis` package is
+installed), so every uvicorn worker or replica sees the same state and idle
+sessions expire on their own. Otherwise they stay in a process-local dict
+with the same TTL, which is what local development uses.
+"""
+
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis_asyncio = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+SessionState = Dict[str, Any]
+
+# Idle sessions are dropped after this long
+DEFAULT_SESSION_TTL_SECONDS = 3600
+
+
+class InMemorySessionStore:
+    """Process-local session store with idle TTL and a size bound."""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_SESSION_TTL_SECONDS, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        # session_id -> (expires_at, state); the state dict is shared, not copied
+        self._sessions: "OrderedDict[str, Tuple[float, SessionState]]" = OrderedDict()
+        # Recently evicted session ids, so callers can tell "expired" from "unknown"
+        self._evicted: "OrderedDict[str, None]" = OrderedDict()
+
+    def _evict(self, now: float):
+        while self._sessions:
+            session_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at > now and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self._evicted[session_id] = None
+            if len(self._evicted) > self.max_sessions:
+                self._evicted.popitem(last=False)
+            print(f"[SESSION] Evicted idle session: {session_id}")
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        """Return the session's state, or None if unknown or expired."""
+        now = time.monotonic()
+        self._evict(now)
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        # Reading a session counts as activity
+        self._sessions[session_id] = (now + self.ttl_seconds, entry[1])
+        self._sessions.move_to_end(session_id)
+        return entry[1]
+
+    async def save(self, session_id: str, state: SessionState):
+        """Store the session's state and refresh its TTL."""
+        now = time.monotonic()
+        self._sessions[session_id] = (now + self.ttl_seconds, state)
+        self._sessions.move_to_end(session_id)
+        self._evict(now)
+
+    async def was_evicted(self, session_id: str) -> bool:
+        """True if the session existed but was dropped for being idle or over the size bound."""
+        return session_id in self._evicted
+
+    async def close(self):
+        pass
+
+
+class RedisSessionStore:
+    """Redis-backed session store shared by all workers; keys expire after the TTL."""
+
+    def __init__(self, url: str, ttl_seconds: float = DEFAULT_SESSION_TTL_SECONDS, prefix: str = "sess:"):
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+        self._redis = redis_asyncio.Redis.from_url(url)
+
+    async def get(self, session_id: str) -> Optional[SessionState]:
+        """Return the session's state, or None if unknown or expired."""
+        raw = await self._redis.get(self.prefix + session_id)
+        if raw is None:
+            return None
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+    async def save(self, session_id: str, state: SessionState):
+        """Store the session's state and refresh its TTL."""
+        blob = orjson.dumps(state) if orjson is not None else json.dumps(state)
+        await self._redis.set(self.prefix + session_id, blob, ex=self.ttl_seconds)
+
+    async def was_evicted(self, session_id: str) -> bool:
+        """Redis expires keys without a trace, so an expired session looks unknown."""
+        return False
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+def create_session_store():
+    """Redis store if REDIS_URL is set and redis is installed, otherwise in-memory."""
+    url = os.getenv("REDIS_URL")
+    if url:
+        if redis_asyncio is not None:
+            return RedisSessionStore(url)
+        print("⚠️  REDIS_URL is set but the redis package is not installed; using in-memory sessions")
+    return InMemorySessionStore()
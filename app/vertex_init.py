@@ -0,0 +1,48 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lazy, process-wide Vertex AI initialization shared by the agents."""
+
+import os
+import threading
+
+_vertex_lock = threading.Lock()
+_vertex_initialized = False
+
+
+def _ensure_vertex_initialized() -> None:
+    """Initialize Vertex AI on first use when no Gemini API key is configured.
+
+    Deferred from import time because it does network and auth work that
+    tests and CLI paths never need. Safe to call repeatedly and concurrently.
+    """
+    global _vertex_initialized
+    if _vertex_initialized or os.environ.get("GEMINI_API_KEY"):
+        return
+    with _vertex_lock:
+        if _vertex_initialized:
+            return
+        _vertex_initialized = True
+        # Fallback to Vertex AI initialization for existing setups.
+        try:
+            import google.auth
+            from google.cloud import aiplatform
+            aiplatform.init(project='triumph-in-the-skies', location='us-central1')
+            _, project_id = google.auth.default()
+            os.environ.setdefault("GOOGLE_CLOUD_PROJECT", "triumph-in-the-skies")
+            os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "us-central1")
+            os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
+        except Exception as e:
+            print(f"Warning: Could not initialize Vertex AI: {e}")
+            print("Please set GEMINI_API_KEY environment variable or configure Google Cloud credentials.")
@@ -15,9 +15,12 @@ echo ""
 # --log-level warning: Only show warnings/errors from uvicorn (hides INFO HTTP logs)
 # --access-log: Disabled to remove HTTP request logs
 # --reload: Auto-reload on file changes for development
+# --loop uvloop / --http httptools: libuv event loop and C HTTP parser (both ship with uvicorn[standard])
 
 .conda/bin/uvicorn app.question_api:app \
     --reload \
+    --loop uvloop \
+    --http httptools \
     --port 8000 \
     --log-level warning \
     --no-access-log
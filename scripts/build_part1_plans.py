@@ -0,0 +1,74 @@
+"""Precompute the Part1 plan table (app/part1_plans.json).
+
+Runs the ExperiencePlanningAgent once for every A/B answer combination of
+DEFAULT_QUESTIONS, using the same fallback profile the QuestionGeneratorAgent
+builds, and stores the SUCCESS plans keyed by answer tuple. Sessions whose
+qa_history matches one of these tuples then skip the planner at runtime.
+
+Usage:
+    python scripts/build_part1_plans.py [--hesitation 2.0]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+from pathlib import Path
+from unittest.mock import Mock
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.experience_planner import ExperiencePlanningAgent
+from app.question_generator import (
+    DEFAULT_QUESTION_TEXTS,
+    PART1_PLANS_PATH,
+    build_fallback_profile,
+)
+
+
+async def build_plans(hesitation: float) -> dict:
+    """Run the planner for every answer tuple and collect the SUCCESS plans."""
+    planner = ExperiencePlanningAgent()
+    plans = {}
+    for answers in itertools.product("ab", repeat=len(DEFAULT_QUESTION_TEXTS)):
+        qa_history = [
+            {"question": question, "answer": answer, "hesitation_seconds": hesitation}
+            for question, answer in zip(DEFAULT_QUESTION_TEXTS, answers)
+        ]
+        state = {
+            "qa_history": qa_history,
+            "user_travel_profile": build_fallback_profile(qa_history),
+        }
+        ctx = Mock()
+        ctx.session.state = state
+        async for _ in planner._run_async_impl(ctx):
+            pass
+
+        key = ",".join(answers)
+        result = state.get("experience_planning_result", {})
+        if result.get("status") == "SUCCESS":
+            plans[key] = result
+            print(f"✓ {key}")
+        else:
+            print(f"⚠️  {key}: {result.get('status')} (not stored)")
+    return plans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute Part1 travel plans")
+    parser.add_argument("--hesitation", type=float, default=2.0,
+                        help="Hesitation seconds used in the generated profiles")
+    parser.add_argument("--output", default=PART1_PLANS_PATH,
+                        help="Output JSON path")
+    args = parser.parse_args()
+
+    plans = asyncio.run(build_plans(args.hesitation))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"questions": list(DEFAULT_QUESTION_TEXTS), "plans": plans}, f, indent=2)
+    print(f"\nWrote {len(plans)} plans to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,8 +26,8 @@ if [ -z "$GEMINI_API_KEY" ]; then
 fi
 
 # Check for vector indexes
-if [ ! -f "RAG/vector_indexes/destination_index.pkl" ]; then
-    echo -e "${RED}❌ Error: destination_index.pkl not found${NC}"
+if [ ! -f "RAG/vector_indexes/destination_index.npy" ]; then
+    echo -e "${RED}❌ Error: destination_index.npy not found${NC}"
     echo "Please build the vector indexes first:"
     echo "  cd RAG"
     echo "  python build_vector_index.py"
@@ -35,8 +35,8 @@ if [ ! -f "RAG/vector_indexes/destination_index.pkl" ]; then
     exit 1
 fi
 
-if [ ! -f "RAG/vector_indexes/experience_index.pkl" ]; then
-    echo -e "${RED}❌ Error: experience_index.pkl not found${NC}"
+if [ ! -f "RAG/vector_indexes/experience_index.npy" ]; then
+    echo -e "${RED}❌ Error: experience_index.npy not found${NC}"
     echo "Please build the vector indexes first:"
     echo "  cd RAG"
     echo "  python build_vector_index.py"
@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the retry policy in RAG/api_retry.py."""
+
+import sys
+from pathlib import Path
+
+import pytest
+from tenacity import wait_none
+
+# The RAG scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "RAG"))
+
+from api_retry import is_transient_error, retry_transient  # noqa: E402
+
+
+class ResourceExhausted(Exception):
+    """Stand-in for google.api_core.exceptions.ResourceExhausted."""
+
+
+class APIError(Exception):
+    """SDK error carrying an HTTP status."""
+
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        ResourceExhausted("quota"),
+        APIError(429),
+        APIError(503),
+        type("ServerError", (Exception,), {"code": 500})(),
+    ],
+)
+def test_transient_errors_are_retried(exc: Exception) -> None:
+    assert is_transient_error(exc)
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [
+        ValueError("bad input"),
+        APIError(400),
+        APIError(404),
+        KeyError("embedding"),
+    ],
+)
+def test_other_errors_are_not_retried(exc: Exception) -> None:
+    assert not is_transient_error(exc)
+
+
+def test_wrapped_transient_error_is_retried() -> None:
+    """A transient error raised as the cause of another error still counts."""
+    try:
+        try:
+            raise APIError(503)
+        except APIError as cause:
+            raise RuntimeError("embedding failed") from cause
+    except RuntimeError as exc:
+        assert is_transient_error(exc)
+
+
+def test_retry_transient_retries_until_success() -> None:
+    calls = []
+
+    @retry_transient
+    def flaky() -> str:
+        calls.append(1)
+        if len(calls) < 3:
+            raise APIError(429)
+        return "ok"
+
+    assert flaky.retry_with(wait=wait_none())() == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_transient_raises_permanent_errors_immediately() -> None:
+    calls = []
+
+    @retry_transient
+    def broken() -> None:
+        calls.append(1)
+        raise APIError(400)
+
+    with pytest.raises(APIError):
+        broken.retry_with(wait=wait_none())()
+    assert len(calls) == 1
+
+
+def test_retry_transient_gives_up_after_five_attempts() -> None:
+    calls = []
+
+    @retry_transient
+    def down() -> None:
+        calls.append(1)
+        raise APIError(503)
+
+    with pytest.raises(APIError):
+        down.retry_with(wait=wait_none())()
+    assert len(calls) == 5
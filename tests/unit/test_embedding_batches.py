@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for batched document embedding in RAG/build_vector_index.py."""
+
+import hashlib
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# The RAG scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "RAG"))
+
+from build_vector_index import EmbeddingGenerator, VectorIndexBuilder  # noqa: E402
+
+DIM = 8
+
+
+def _vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+class FakeGenai:
+    """Stand-in for google.generativeai that records every embed_content request."""
+
+    def __init__(self, delays: Optional[Dict[str, float]] = None) -> None:
+        self.requests: List[List[str]] = []
+        self.delays = delays or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_content(self, model: str, content: List[str], task_type: str) -> dict:
+        with self._lock:
+            self.requests.append(list(content))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delays.get(content[0], 0.0))
+        with self._lock:
+            self.in_flight -= 1
+        return {"embedding": [_vector(text).tolist() for text in content]}
+
+
+def _generator(genai: FakeGenai) -> EmbeddingGenerator:
+    """EmbeddingGenerator wired to a fake API, bypassing the API key and SDK import."""
+    generator = EmbeddingGenerator.__new__(EmbeddingGenerator)
+    generator.genai = genai
+    generator.model_name = "models/text-embedding-004"
+    generator.dimension = DIM
+    generator.cache = None
+    return generator
+
+
+def _expected(texts: List[str]) -> np.ndarray:
+    return np.stack([_vector(text) for text in texts])
+
+
+def _unit(rows: np.ndarray) -> np.ndarray:
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_embed_batch_sends_one_request_per_batch() -> None:
+    """Each batch is a single embed_content call; rows come back in texts order."""
+    genai = FakeGenai()
+    texts = [f"text {i}" for i in range(10)]
+
+    embeddings = _generator(genai).embed_batch(texts, batch_size=3, max_workers=1)
+
+    assert genai.requests == [texts[0:3], texts[3:6], texts[6:9], texts[9:10]]
+    np.testing.assert_array_equal(embeddings, _expected(texts))
+
+
+def test_concurrent_batches_finishing_out_of_order_keep_texts_order() -> None:
+    """Earlier batches finish last, yet every row lands at its text's offset."""
+    texts = [f"text {i}" for i in range(12)]
+    # Batch i starts with texts[2 * i]; earlier batches are the slowest
+    genai = FakeGenai(delays={texts[i]: 0.05 - 0.008 * (i // 2) for i in range(0, 12, 2)})
+
+    embeddings = _generator(genai).embed_batch(texts, batch_size=2, max_workers=3)
+
+    assert len(genai.requests) == 6
+    assert 1 < genai.max_in_flight <= 3
+    np.testing.assert_array_equal(embeddings, _expected(texts))
+
+
+def test_documents_are_batched_by_length_but_returned_in_texts_order() -> None:
+    """Requests group texts of similar length; row i still belongs to texts[i]."""
+    genai = FakeGenai()
+    texts = ["x" * n for n in (9, 2, 7, 1, 8, 3, 6, 4, 5)]
+    builder = VectorIndexBuilder(_generator(genai))
+
+    embeddings, _ = builder._embed_documents(texts)
+
+    sent = [text for request in genai.requests for text in request]
+    assert sent == sorted(texts, key=len)
+    np.testing.assert_allclose(embeddings, _unit(_expected(texts)), rtol=1e-6)
+
+
+def test_duplicate_documents_are_embedded_once() -> None:
+    """Each distinct text is sent once and its row is copied to every duplicate."""
+    genai = FakeGenai()
+    texts = ["beach", "city break", "beach", "hiking", "city break", "beach"]
+    builder = VectorIndexBuilder(_generator(genai))
+
+    embeddings, hashes = builder._embed_documents(texts)
+
+    sent = [text for request in genai.requests for text in request]
+    assert sorted(sent) == ["beach", "city break", "hiking"]
+    np.testing.assert_allclose(embeddings, _unit(_expected(texts)), rtol=1e-6)
+    np.testing.assert_array_equal(hashes, builder._content_hashes(texts))
@@ -0,0 +1,103 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for incremental index builds in RAG/build_vector_index.py."""
+
+import hashlib
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# The RAG scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "RAG"))
+
+from build_vector_index import VectorIndexBuilder  # noqa: E402
+from vector_index import VectorIndex  # noqa: E402
+
+DIM = 8
+
+
+def _vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def _unit(text: str) -> np.ndarray:
+    v = _vector(text)
+    return v / np.linalg.norm(v)
+
+
+class FakeGenerator:
+    """Deterministic stand-in for EmbeddingGenerator that records API calls."""
+
+    model_name = "models/text-embedding-004"
+    dimension = DIM
+
+    def __init__(self) -> None:
+        self.calls: List[List[str]] = []
+
+    def embed_batch(self, texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> np.ndarray:
+        self.calls.append(list(texts))
+        return np.stack([_vector(t) for t in texts])
+
+
+def _build(builder: VectorIndexBuilder, texts: List[str], output_dir: Path, **metadata) -> None:
+    embeddings, hashes = builder._embed_documents(texts)
+    index = VectorIndex(
+        embeddings=embeddings,
+        documents=[{"experience_id": f"E{i}"} for i in range(len(texts))],
+        metadata={"embedding_model": "text-embedding-004", "normalized": True, **metadata},
+    )
+    builder._save_index(index, str(output_dir), "experience_index", hashes)
+
+
+def test_unchanged_rows_are_reused_in_texts_order(tmp_path: Path) -> None:
+    """Only new texts reach the API; reused rows land at their new positions."""
+    generator = FakeGenerator()
+    builder = VectorIndexBuilder(generator)
+    _build(builder, ["alpha", "beta", "gamma"], tmp_path)
+
+    generator.calls.clear()
+    previous = builder._load_previous_embeddings(str(tmp_path), "experience_index", "text-embedding-004", DIM)
+    assert len(previous) == 3
+
+    texts = ["gamma", "delta", "alpha"]
+    embeddings, hashes = builder._embed_documents(texts, previous)
+
+    assert generator.calls == [["delta"]]
+    np.testing.assert_allclose(embeddings, np.stack([_unit(t) for t in texts]), rtol=1e-6)
+    np.testing.assert_array_equal(hashes, builder._content_hashes(texts))
+
+
+def test_previous_index_from_another_model_is_ignored(tmp_path: Path) -> None:
+    """Rows embedded by a different model or at another dimension are never reused."""
+    builder = VectorIndexBuilder(FakeGenerator())
+    _build(builder, ["alpha", "beta"], tmp_path, embedding_model="embedding-001")
+
+    assert builder._load_previous_embeddings(str(tmp_path), "experience_index", "text-embedding-004", DIM) == {}
+
+    _build(builder, ["alpha", "beta"], tmp_path)
+    assert builder._load_previous_embeddings(str(tmp_path), "experience_index", "text-embedding-004", DIM * 2) == {}
+    assert len(builder._load_previous_embeddings(str(tmp_path), "experience_index", "text-embedding-004", DIM)) == 2
+
+
+def test_empty_texts_without_previous_index() -> None:
+    """An empty corpus with nothing to reuse yields an empty (0, dim) array."""
+    generator = FakeGenerator()
+    embeddings, hashes = VectorIndexBuilder(generator)._embed_documents([], {})
+
+    assert embeddings.shape == (0, DIM)
+    assert hashes.shape == (0,)
+    assert generator.calls == []
@@ -0,0 +1,168 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for RAG/rag_retriever.py against a brute-force cosine reference."""
+
+import hashlib
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pytest
+
+# The RAG scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "RAG"))
+
+import rag_retriever  # noqa: E402
+from rag_retriever import SemanticRetriever  # noqa: E402
+from vector_index import VectorIndex  # noqa: E402
+
+DIM = 16
+N_DESTINATIONS = 6
+N_EXPERIENCES = 60
+QUERIES = [f"query {i}" for i in range(8)]
+
+
+def _vector(text: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+class FakeGenerator:
+    """Deterministic stand-in for EmbeddingGenerator.embed_text."""
+
+    def embed_text(self, text: str, task_type: str = "RETRIEVAL_QUERY") -> np.ndarray:
+        return _vector(text)
+
+
+def _unit_rows(n: int, seed: int) -> np.ndarray:
+    rows = np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture(params=["default", "numpy"])
+def retriever(
+    request: pytest.FixtureRequest, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> SemanticRetriever:
+    """Retriever over random unit-length indexes, with simsimd (if installed) or plain NumPy."""
+    if request.param == "numpy":
+        monkeypatch.setattr(rag_retriever, "simsimd", None)
+    destinations = [
+        {"destination_id": f"D{i}", "destination_name": f"Destination {i}"}
+        for i in range(N_DESTINATIONS)
+    ]
+    experiences = [
+        {
+            "experience_id": f"E{i}",
+            "experience_name": f"Experience {i}",
+            "parent_destination_id": f"D{i % N_DESTINATIONS}",
+        }
+        for i in range(N_EXPERIENCES)
+    ]
+    for name, embeddings, documents in (
+        ("destination_index", _unit_rows(N_DESTINATIONS, 1), destinations),
+        ("experience_index", _unit_rows(N_EXPERIENCES, 2), experiences),
+    ):
+        index_type = name.split("_")[0]
+        VectorIndex(
+            embeddings=embeddings,
+            documents=documents,
+            metadata={"index_type": index_type, "normalized": True},
+        ).save(tmp_path / name)
+
+    retriever = SemanticRetriever(FakeGenerator())
+    retriever.load_indexes(str(tmp_path))
+    return retriever
+
+
+def _brute_force_ids(
+    index: VectorIndex, query: str, top_k: int, destination_id: Optional[str] = None
+) -> List[str]:
+    """Experience ids ranked by plain cosine similarity, optionally within one destination."""
+    embeddings = np.asarray(index.embeddings, dtype=np.float64)
+    q = _vector(query).astype(np.float64)
+    scores = embeddings @ q / (np.linalg.norm(embeddings, axis=1) * np.linalg.norm(q))
+    ranked = [int(i) for i in np.argsort(-scores, kind="stable")]
+    if destination_id is not None:
+        ranked = [i for i in ranked if index.documents[i]["parent_destination_id"] == destination_id]
+    return [index.documents[i]["experience_id"] for i in ranked[:top_k]]
+
+
+def _ids(documents: List[dict]) -> List[str]:
+    return [doc["experience_id"] for doc in documents]
+
+
+@pytest.mark.parametrize("top_k", [1, 7, N_EXPERIENCES, N_EXPERIENCES + 5])
+def test_experience_retriever_matches_brute_force(retriever: SemanticRetriever, top_k: int) -> None:
+    """argpartition + sort of the k candidates gives the same ranking as a full sort."""
+    for query in QUERIES:
+        expected = _brute_force_ids(retriever.experience_index, query, top_k)
+        assert _ids(retriever.experience_retriever(query, top_k=top_k)) == expected
+
+
+def test_batch_search_matches_single_queries(retriever: SemanticRetriever) -> None:
+    """One matrix-matrix product gives the same results as one search per query."""
+    index = retriever.experience_index
+    batched = retriever.batch_search(QUERIES, index, top_k=5)
+    singles = [retriever.batch_search([query], index, top_k=5)[0] for query in QUERIES]
+
+    assert [[doc["experience_id"] for doc, _ in r] for r in batched] == [
+        [doc["experience_id"] for doc, _ in r] for r in singles
+    ]
+    for batch_results, single_results in zip(batched, singles):
+        np.testing.assert_allclose(
+            [score for _, score in batch_results], [score for _, score in single_results], rtol=1e-5
+        )
+
+
+def test_destination_id_lookup_keeps_caller_order(retriever: SemanticRetriever) -> None:
+    """Bottom-Up lookups return each known id once, in the order given."""
+    documents = retriever.destination_retriever(destination_ids=["D3", "D1", "D3", "missing", "D0"])
+    assert [doc["destination_id"] for doc in documents] == ["D3", "D1", "D0"]
+
+
+@pytest.mark.parametrize("top_k", [1, 4, N_EXPERIENCES])
+def test_destination_filter_matches_brute_force(retriever: SemanticRetriever, top_k: int) -> None:
+    """Selecting a destination's score columns ranks like filtering before scoring."""
+    for destination_id in ("D0", "D4"):
+        for query in QUERIES:
+            expected = _brute_force_ids(retriever.experience_index, query, top_k, destination_id)
+            assert _ids(retriever.experience_retriever(query, destination_id=destination_id, top_k=top_k)) == expected
+    assert retriever.experience_retriever(QUERIES[0], destination_id="missing") == []
+
+
+def test_experiences_by_destination_match_per_destination_searches(retriever: SemanticRetriever) -> None:
+    """One scoring pass split by destination equals one filtered search each."""
+    destination_ids = ["D2", "D0", "missing", "D5"]
+    for query in QUERIES:
+        by_destination = retriever.experience_retriever_by_destination(query, destination_ids, top_k_per_dest=3)
+        assert list(by_destination) == destination_ids
+        for destination_id in destination_ids:
+            expected = _brute_force_ids(retriever.experience_index, query, 3, destination_id)
+            assert _ids(by_destination[destination_id]) == expected
+
+
+def test_reused_buffers_do_not_leak_between_searches(retriever: SemanticRetriever) -> None:
+    """Alternating index sizes and concurrent threads never see another search's scores."""
+    expected = {query: _brute_force_ids(retriever.experience_index, query, 5) for query in QUERIES}
+
+    # The destination index is smaller, so this thread's buffer is sliced and regrown
+    for query in QUERIES:
+        retriever.destination_retriever(query_string=query, top_k=2)
+        assert _ids(retriever.experience_retriever(query, top_k=5)) == expected[query]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda q: _ids(retriever.experience_retriever(q, top_k=5)), QUERIES * 10))
+    assert results == [expected[query] for query in QUERIES * 10]
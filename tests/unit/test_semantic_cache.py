@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for app/semantic_cache.py."""
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import numpy as np
+import pytest
+
+from app import experience_planner, semantic_cache
+from app.experience_planner import ExperiencePlanningAgent
+from app.semantic_cache import SemanticCache
+
+
+def _payload(name: str) -> tuple:
+    return ([{"destination_id": name}], [])
+
+
+def test_exact_key_ignores_case_and_whitespace() -> None:
+    cache = SemanticCache()
+    cache.put(cache.make_key("Loves  Hiking\nand food"), None, _payload("D1"))
+    assert cache.get_exact(cache.make_key("loves hiking and FOOD")) == _payload("D1")
+    assert cache.get_exact(cache.make_key("loves museums")) is None
+
+
+def test_similar_profile_hits_above_threshold_only() -> None:
+    cache = SemanticCache(threshold=0.9)
+    cache.put("beach", np.array([1.0, 0.0, 0.0]), _payload("D1"))
+    cache.put("city", np.array([0.0, 1.0, 0.0]), _payload("D2"))
+
+    # Unnormalized queries are fine; cosine ~0.995 and ~0.71
+    assert cache.get_similar(np.array([10.0, 1.0, 0.0])) == _payload("D1")
+    assert cache.get_similar(np.array([1.0, 1.0, 0.0])) is None
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = SemanticCache(max_entries=2)
+    cache.put("a", None, _payload("A"))
+    cache.put("b", None, _payload("B"))
+    cache.get_exact("a")
+    cache.put("c", None, _payload("C"))
+
+    assert cache.get_exact("b") is None
+    assert cache.get_exact("a") == _payload("A")
+    assert cache.get_exact("c") == _payload("C")
+
+
+def test_entries_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    now = [0.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticCache(ttl_seconds=10)
+    cache.put("a", np.array([1.0, 0.0]), _payload("A"))
+
+    now[0] = 9.0
+    assert cache.get_exact("a") is not None
+    now[0] = 10.0
+    assert cache.get_exact("a") is None
+    assert cache.get_similar(np.array([1.0, 0.0])) is None
+
+
+def test_answers_key_depends_on_answers_and_questions() -> None:
+    questions = ["Spa / Markets", "Museums / Food"]
+    key = SemanticCache.make_answers_key(questions, 0b0100)
+    assert key == SemanticCache.make_answers_key(list(questions), 0b0100)
+    assert key != SemanticCache.make_answers_key(questions, 0b0001)
+    # "a" packs to 0 bits, so the answer count must be part of the key
+    assert SemanticCache.make_answers_key(questions[:1], 0) != SemanticCache.make_answers_key(questions, 0)
+    assert key != SemanticCache.make_answers_key(["Spa / Markets", "Bars / Hiking"], 0b0100)
+
+
+class _FakeToolkit:
+    """Every profile embeds to the same vector, so any similarity lookup would hit."""
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return np.array([1.0, 0.0], dtype=np.float32)
+
+
+def _fallback_state(answers: List[str], answer_bits: int) -> Dict[str, Any]:
+    qa_history = [
+        {"question": question, "answer": answer, "hesitation_seconds": 2.0}
+        for question, answer in zip(["Spa / Markets", "Museums / Food"], answers)
+    ]
+    profile = "User travel profile based on answers: " + "; ".join(
+        f"{entry['question']} -> {entry['answer']} (2.0s)" for entry in qa_history
+    )
+    return {
+        "user_travel_profile": profile,
+        "profile_from_answers": True,
+        "qa_history": qa_history,
+        "answer_bits": answer_bits,
+    }
+
+
+def test_fallback_profiles_with_different_answers_do_not_share_an_entry(
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Fallback profiles are matched by answer tuple, never by embedding similarity."""
+    cache = SemanticCache(threshold=0.0)
+    monkeypatch.setattr(experience_planner, "get_semantic_cache", lambda: cache)
+    monkeypatch.setattr(ExperiencePlanningAgent, "_get_rag_toolkit", lambda self: _FakeToolkit())
+
+    retrieved = []
+
+    async def fake_retrieve(self, rag_toolkit, profile, qa_history):
+        retrieved.append(profile)
+        dest_id = "D-" + "".join(entry["answer"] for entry in qa_history)
+        return [{"destination_id": dest_id, "destination_name": dest_id}], []
+
+    monkeypatch.setattr(ExperiencePlanningAgent, "_retrieve", fake_retrieve)
+
+    async def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        ctx = SimpleNamespace(session=SimpleNamespace(state=state))
+        async for _ in ExperiencePlanningAgent()._run_async_impl(ctx):
+            pass
+        return state["experience_planning_result"]
+
+    agent_ab = asyncio.run(run(_fallback_state(["a", "b"], 0b0100)))
+    agent_ba = asyncio.run(run(_fallback_state(["b", "a"], 0b0001)))
+    again_ab = asyncio.run(run(_fallback_state(["a", "b"], 0b0100)))
+
+    assert len(retrieved) == 2
+    assert agent_ab["data"][0]["destination_id"] == "D-ab"
+    assert agent_ba["data"][0]["destination_id"] == "D-ba"
+    assert again_ab == agent_ab
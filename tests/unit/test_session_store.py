@@ -0,0 +1,102 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for session storage and the expired-session (410) path."""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app import question_api, session_store
+from app.session_store import InMemorySessionStore, create_session_store
+
+
+class FakeClock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake = FakeClock()
+    monkeypatch.setattr(session_store.time, "monotonic", fake)
+    return fake
+
+
+def test_session_expires_after_idle_ttl(clock: FakeClock) -> None:
+    store = InMemorySessionStore(ttl_seconds=60)
+    asyncio.run(store.save("s1", {"qa_history": []}))
+
+    clock.now += 59
+    assert asyncio.run(store.get("s1")) == {"qa_history": []}
+
+    # The read refreshed the TTL, so the session is still alive 59s later
+    clock.now += 59
+    assert asyncio.run(store.get("s1")) is not None
+
+    clock.now += 61
+    assert asyncio.run(store.get("s1")) is None
+    assert asyncio.run(store.was_evicted("s1"))
+
+
+def test_least_recently_used_session_is_evicted_over_size_bound(clock: FakeClock) -> None:
+    store = InMemorySessionStore(ttl_seconds=60, max_sessions=2)
+    asyncio.run(store.save("s1", {}))
+    asyncio.run(store.save("s2", {}))
+    asyncio.run(store.get("s1"))  # s2 is now the least recently used
+    asyncio.run(store.save("s3", {}))
+
+    assert asyncio.run(store.get("s2")) is None
+    assert asyncio.run(store.was_evicted("s2"))
+    assert asyncio.run(store.get("s1")) is not None
+    assert asyncio.run(store.get("s3")) is not None
+
+
+def test_unknown_session_was_not_evicted() -> None:
+    store = InMemorySessionStore()
+    assert asyncio.run(store.get("missing")) is None
+    assert not asyncio.run(store.was_evicted("missing"))
+
+
+def test_in_memory_store_without_redis_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("REDIS_URL", raising=False)
+    assert isinstance(create_session_store(), InMemorySessionStore)
+
+
+def test_load_session_reports_expired_session_as_410(
+    clock: FakeClock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = InMemorySessionStore(ttl_seconds=60)
+    monkeypatch.setattr(question_api, "SESSIONS", store)
+    asyncio.run(store.save("s1", {"session_id": "s1"}))
+
+    assert asyncio.run(question_api.load_session("s1")) == {"session_id": "s1"}
+
+    clock.now += 61
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(question_api.load_session("s1"))
+    assert exc_info.value.status_code == 410
+    assert exc_info.value.headers == {"X-Session-Expired": "true"}
+
+
+def test_load_session_reports_unknown_session_as_404(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(question_api, "SESSIONS", InMemorySessionStore())
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(question_api.load_session("never-created"))
+    assert exc_info.value.status_code == 404
@@ -0,0 +1,98 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Unit tests for the on-disk format of RAG/vector_index.py."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# The RAG scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "RAG"))
+
+from vector_index import VectorIndex  # noqa: E402
+
+
+def _make_index() -> VectorIndex:
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((5, 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    documents = [{"destination_id": f"D{i}", "name": f"Dest {i}"} for i in range(5)]
+    return VectorIndex(embeddings=embeddings, documents=documents, metadata={"normalized": True})
+
+
+def test_save_load_float32_round_trip(tmp_path: Path) -> None:
+    """A float32 index comes back memory-mapped with documents, metadata and norms."""
+    index = _make_index()
+    path = tmp_path / "destination_index"
+    index.save(path)
+
+    assert path.with_suffix(".npy").exists()
+    assert path.with_suffix(".json").exists()
+    assert not path.with_suffix(".scales.npy").exists()
+
+    loaded = VectorIndex.load(path)
+    assert isinstance(loaded.embeddings, np.memmap)
+    assert loaded.embeddings.dtype == np.float32
+    assert loaded.embeddings.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(loaded.embeddings, index.embeddings)
+    assert loaded.documents == index.documents
+    assert loaded.metadata == index.metadata
+    assert loaded.scales is None
+    np.testing.assert_allclose(loaded.half_sq_norms, index.compute_half_sq_norms())
+
+
+def test_save_load_int8_round_trip(tmp_path: Path) -> None:
+    """A quantized index keeps its int8 rows, row scales and float32 norms."""
+    index = _make_index().quantize_int8()
+    path = tmp_path / "experience_index"
+    index.save(path)
+
+    loaded = VectorIndex.load(path)
+    assert loaded.embeddings.dtype == np.int8
+    assert loaded.metadata["dtype"] == "int8"
+    np.testing.assert_array_equal(loaded.embeddings, index.embeddings)
+    np.testing.assert_array_equal(loaded.scales, index.scales)
+    np.testing.assert_allclose(loaded.half_sq_norms, index.half_sq_norms)
+
+    # Dequantized rows stay close to the original unit vectors
+    original = _make_index().embeddings
+    dequantized = loaded.embeddings.astype(np.float32) / loaded.scales[:, None]
+    np.testing.assert_allclose(dequantized, original, atol=1e-2)
+
+
+def test_load_eagerly(tmp_path: Path) -> None:
+    """mmap_mode=None reads the embeddings into an ordinary array."""
+    index = _make_index()
+    path = tmp_path / "destination_index"
+    index.save(path)
+
+    loaded = VectorIndex.load(path, mmap_mode=None)
+    assert not isinstance(loaded.embeddings, np.memmap)
+    np.testing.assert_array_equal(loaded.embeddings, index.embeddings)
+
+
+def test_save_removes_stale_blocked_copy(tmp_path: Path) -> None:
+    """Saving without block_width deletes a blocked copy left by an earlier build."""
+    index = _make_index()
+    path = tmp_path / "destination_index"
+
+    index.metadata["block_width"] = 8
+    index.save(path)
+    blocked = np.load(path.with_suffix(".blocked.npy"))
+    assert blocked.shape == (1, 8, 8)
+
+    del index.metadata["block_width"]
+    index.save(path)
+    assert not path.with_suffix(".blocked.npy").exists()